@@ -21,6 +21,100 @@ const API_BASE_URL = (function() {
     return stored && stored.trim() !== '' ? stored : 'https://5n2tv37eki.execute-api.us-west-1.amazonaws.com/prod';
 })();
 
+// localStorage key of the cached problem list; versioned so rows of an older shape are dropped
+const PROBLEM_CACHE_KEY = 'problemCatalog.v2';
+
+// Shape of GET /api/user/{id}/bootstrap this client understands
+const BOOTSTRAP_FORMAT_VERSION = 1;
+
+// Accept header for bulk endpoints: MessagePack, then columnar JSON, then plain JSON
+const BULK_ACCEPT = 'application/msgpack, application/vnd.dsa.columnar+json;q=0.9, application/json;q=0.5';
+
+// The user's local date as YYYY-MM-DD (solve dates and streaks follow the user's day, not the server's)
+function localDateKey(date = new Date()) {
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${year}-${month}-${day}`;
+}
+
+// Minimal MessagePack decoder (everything but ext types)
+function decodeMsgpack(bytes) {
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    const utf8 = new TextDecoder();
+    let pos = 0;
+    const str = (length) => utf8.decode(bytes.subarray(pos, pos += length));
+    const bin = (length) => bytes.slice(pos, pos += length);
+    const array = (length) => {
+        const items = new Array(length);
+        for (let i = 0; i < length; i++) items[i] = read();
+        return items;
+    };
+    const map = (length) => {
+        const object = {};
+        for (let i = 0; i < length; i++) {
+            const key = read();
+            object[key] = read();
+        }
+        return object;
+    };
+    const next = (size, get) => { const value = get(pos); pos += size; return value; };
+    function read() {
+        const type = bytes[pos++];
+        if (type <= 0x7f) return type;
+        if (type <= 0x8f) return map(type & 0x0f);
+        if (type <= 0x9f) return array(type & 0x0f);
+        if (type <= 0xbf) return str(type & 0x1f);
+        if (type >= 0xe0) return type - 0x100;
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return bin(next(1, p => view.getUint8(p)));
+            case 0xc5: return bin(next(2, p => view.getUint16(p)));
+            case 0xc6: return bin(next(4, p => view.getUint32(p)));
+            case 0xca: return next(4, p => view.getFloat32(p));
+            case 0xcb: return next(8, p => view.getFloat64(p));
+            case 0xcc: return next(1, p => view.getUint8(p));
+            case 0xcd: return next(2, p => view.getUint16(p));
+            case 0xce: return next(4, p => view.getUint32(p));
+            case 0xcf: return next(8, p => Number(view.getBigUint64(p)));
+            case 0xd0: return next(1, p => view.getInt8(p));
+            case 0xd1: return next(2, p => view.getInt16(p));
+            case 0xd2: return next(4, p => view.getInt32(p));
+            case 0xd3: return next(8, p => Number(view.getBigInt64(p)));
+            case 0xd9: return str(next(1, p => view.getUint8(p)));
+            case 0xda: return str(next(2, p => view.getUint16(p)));
+            case 0xdb: return str(next(4, p => view.getUint32(p)));
+            case 0xdc: return array(next(2, p => view.getUint16(p)));
+            case 0xdd: return array(next(4, p => view.getUint32(p)));
+            case 0xde: return map(next(2, p => view.getUint16(p)));
+            case 0xdf: return map(next(4, p => view.getUint32(p)));
+        }
+        throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+    }
+    return read();
+}
+
+// Rows back from the columnar layout ({count, columns, dictionaries}); plain arrays pass through
+function fromColumnar(table) {
+    if (!table || Array.isArray(table)) return table;
+    const { count, columns, dictionaries } = table;
+    const decoded = Object.entries(columns).map(([field, values]) => {
+        const dictionary = dictionaries[field];
+        if (!dictionary) return [field, values];
+        const lookup = code => (code === null ? null : dictionary[code]);
+        return [field, values.map(value => (Array.isArray(value) ? value.map(lookup) : lookup(value)))];
+    });
+    const rows = new Array(count);
+    for (let i = 0; i < count; i++) {
+        const row = {};
+        decoded.forEach(([field, values]) => { row[field] = values[i]; });
+        rows[i] = row;
+    }
+    return rows;
+}
+
 class APIClient {
     constructor(baseUrl = API_BASE_URL) {
         this.baseUrl = baseUrl;
@@ -90,6 +184,10 @@ class APIClient {
                 }
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
+            const contentType = response.headers.get('Content-Type') || '';
+            if (contentType.startsWith('application/msgpack')) {
+                return decodeMsgpack(new Uint8Array(await response.arrayBuffer()));
+            }
             return await response.json();
         } catch (error) {
             console.error('API request failed:', error);
@@ -97,9 +195,105 @@ class APIClient {
         }
     }
 
+    // GET of a bulk endpoint in the most compact format the backend offers
+    async requestBulk(endpoint) {
+        return await this.request(endpoint, { headers: { 'Accept': BULK_ACCEPT } });
+    }
+
     // Problems API
     async getAllProblems() {
-        return await this.request('/api/problems/');
+        return fromColumnar(await this.requestBulk('/api/problems/'));
+    }
+
+    // solution_text isn't part of the problem list; it is loaded per problem
+    async getProblemSolution(problemId) {
+        return await this.request(`/api/problems/${problemId}/solution`);
+    }
+
+    async getProblemChanges(since) {
+        const query = since ? `?since=${encodeURIComponent(since)}` : '';
+        const changes = await this.requestBulk(`/api/problems/changes${query}`);
+        if (changes) changes.upserted = fromColumnar(changes.upserted);
+        return changes;
+    }
+
+    readProblemCache() {
+        try {
+            localStorage.removeItem('problemCatalog');  // pre-v2 cache, rows still carry solution_text
+            return JSON.parse(localStorage.getItem(PROBLEM_CACHE_KEY) || 'null');
+        } catch (e) {
+            return null;  // corrupt cache - start over
+        }
+    }
+
+    // Apply {version, upserted, deleted} to the cached list, save it and return the problems
+    applyProblemChanges(cached, changes) {
+        const byId = new Map(cached && cached.version ? cached.problems.map(p => [p.id, p]) : []);
+        changes.deleted.forEach(id => byId.delete(id));
+        changes.upserted.forEach(p => byId.set(p.id, p));
+        const problems = Array.from(byId.values()).sort((a, b) => a.id - b.id);
+        try {
+            localStorage.setItem(PROBLEM_CACHE_KEY, JSON.stringify({ version: changes.version, problems }));
+        } catch (e) { /* storage full - just don't cache */ }
+        return problems;
+    }
+
+    // Problem list kept in localStorage and brought up to date with /changes,
+    // so only problems added/edited/removed since the last visit are downloaded
+    async getAllProblemsCached() {
+        const cached = this.readProblemCache();
+        let changes;
+        try {
+            changes = await this.getProblemChanges(cached && cached.version);
+        } catch (error) {
+            // Unknown version or older backend without /changes: fall back to the full list
+            localStorage.removeItem(PROBLEM_CACHE_KEY);
+            return await this.getAllProblems();
+        }
+        if (!changes) return cached ? cached.problems : [];
+        return this.applyProblemChanges(cached, changes);
+    }
+
+    // Everything the main page loads, in one request: { problems, solved, revision, stats,
+    // calendar, company_tags, problem_tags }; problems come back as the full (cached) list
+    async getBootstrap(days = 371) {
+        let cached = this.readProblemCache();
+        const query = (since) => new URLSearchParams({ days, today: localDateKey(), ...(since ? { since } : {}) });
+        let boot;
+        try {
+            boot = await this.requestBulk(`/api/user/${this.userId}/bootstrap?${query(cached && cached.version)}`);
+        } catch (error) {
+            if (!cached) throw error;
+            // Cached version no longer understood - start over with the full list
+            localStorage.removeItem(PROBLEM_CACHE_KEY);
+            cached = null;
+            boot = await this.requestBulk(`/api/user/${this.userId}/bootstrap?${query(null)}`);
+        }
+        if (!boot) return boot;
+        if (boot.format_version !== BOOTSTRAP_FORMAT_VERSION) {
+            throw new Error(`Unsupported bootstrap format ${boot.format_version}`);
+        }
+        boot.problems.upserted = fromColumnar(boot.problems.upserted);
+        boot.problems = this.applyProblemChanges(cached, boot.problems);
+        return boot;
+    }
+
+    // Server-side search/filter: { q, difficulty, topic, subtopic, company_tag: [ids], solved, limit, cursor }
+    async searchProblems(filters = {}) {
+        const params = new URLSearchParams();
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value === undefined || value === null || value === '') return;
+            (Array.isArray(value) ? value : [value]).forEach(v => params.append(key, v));
+        });
+        return fromColumnar(await this.requestBulk(`/api/problems/search?${params}`));
+    }
+
+    async suggestProblems(query, limit = 10) {
+        return await this.request(`/api/problems/suggest?q=${encodeURIComponent(query)}&limit=${limit}`);
+    }
+
+    async getProblemFacets(includeSolved = false) {
+        return await this.request(`/api/problems/facets${includeSolved ? '?solved=true' : ''}`);
     }
 
     async getProblemById(id) {
@@ -107,7 +301,7 @@ class APIClient {
     }
 
     async getProblemsByCategory(category) {
-        return await this.request(`/api/problems/by-category/${category}`);
+        return fromColumnar(await this.requestBulk(`/api/problems/by-category/${category}`));
     }
 
     async createProblem(problemData) {
@@ -125,16 +319,12 @@ class APIClient {
 
     // User Progress API
     async getSolvedProblems() {
-        return await this.request(`/api/user/${this.userId}/solved`);
+        return await this.requestBulk(`/api/user/${this.userId}/solved`);
     }
 
     async markProblemSolved(problemId) {
         // Send user's local date to avoid timezone issues
-        const today = new Date();
-        const year = today.getFullYear();
-        const month = String(today.getMonth() + 1).padStart(2, '0');
-        const day = String(today.getDate()).padStart(2, '0');
-        const localDate = `${year}-${month}-${day}`;
+        const localDate = localDateKey();
         
         console.log(`Marking problem ${problemId} as solved with date: ${localDate}`);
         
@@ -154,12 +344,23 @@ class APIClient {
         );
     }
 
+    // Many progress changes in one request: [{ action: 'solve'|'unsolve'|'add_revision'|'remove_revision', problem_id }]
+    // Returns the updated stats
+    async applyProgressBatch(operations) {
+        const solvedAt = localDateKey();
+        return await this.request(`/api/user/${this.userId}/progress:batch`, {
+            method: 'POST',
+            body: { operations: operations.map(op => (op.action === 'solve' ? { solved_at: solvedAt, ...op } : op)) }
+        });
+    }
+
     async getStats() {
         return await this.request(`/api/user/${this.userId}/stats`);
     }
 
-    async getCalendarData() {
-        return await this.request(`/api/user/${this.userId}/calendar`);
+    // { days: [{ date, problem_count }], current_streak, longest_streak } for the last `days` days
+    async getCalendarData(days = 371) {
+        return await this.request(`/api/user/${this.userId}/calendar?days=${days}&today=${localDateKey()}`);
     }
 
     // Company Tags API
@@ -188,12 +389,12 @@ class APIClient {
     }
 
     async getAllProblemCompanyTags() {
-        return await this.request('/api/company-tags/all-problem-tags');
+        return await this.requestBulk('/api/company-tags/all-problem-tags');
     }
 
     // Revision API
     async getRevisionList() {
-        return await this.request(`/api/user/${this.userId}/revision`);
+        return await this.requestBulk(`/api/user/${this.userId}/revision`);
     }
 
     async addToRevision(problemId) {
@@ -0,0 +1,34 @@
+-- Tombstones for deleted problems, so clients can sync the catalog incrementally
+-- (GET /api/problems/changes?since=...). Created/updated rows are found by updated_at.
+create table if not exists problem_tombstones (
+    problem_id bigint primary key,
+    deleted_at timestamp not null default now()
+);
+
+create index if not exists idx_problem_tombstones_deleted_at on problem_tombstones(deleted_at);
+
+create or replace function record_problem_tombstone()
+returns trigger as $$
+begin
+    insert into problem_tombstones (problem_id, deleted_at)
+    values (old.id, now())
+    on conflict (problem_id) do update set deleted_at = excluded.deleted_at;
+    return old;
+end;
+$$ language 'plpgsql';
+
+drop trigger if exists record_problem_tombstone on problems;
+create trigger record_problem_tombstone
+    after delete on problems
+    for each row
+    execute function record_problem_tombstone();
+
+alter table problem_tombstones enable row level security;
+
+do $$ begin
+    if not exists (
+        select 1 from pg_policies where schemaname = 'public' and tablename = 'problem_tombstones' and policyname = 'Allow all on problem_tombstones'
+    ) then
+        create policy "Allow all on problem_tombstones" on problem_tombstones for all using (true) with check (true);
+    end if;
+end $$;
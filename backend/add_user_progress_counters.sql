@@ -0,0 +1,36 @@
+-- Per-user progress counters, so GET /api/user/{user_id}/stats is one primary-key lookup.
+-- Kept up to date by the progress endpoints in the same transaction as each change;
+-- reconcile_progress_counters.py recomputes them from user_progress.
+create table if not exists user_progress_counters (
+    user_id varchar(255) primary key,
+    easy_solved integer not null default 0,
+    medium_solved integer not null default 0,
+    hard_solved integer not null default 0,
+    revision_count integer not null default 0,
+    last_solved_at date,
+    updated_at timestamp not null default now()
+);
+
+-- Backfill from existing progress (users without a row are also filled in on first use)
+insert into user_progress_counters (user_id, easy_solved, medium_solved, hard_solved, revision_count, last_solved_at)
+select
+    up.user_id,
+    count(*) filter (where up.solved and p.difficulty = 'Easy'),
+    count(*) filter (where up.solved and p.difficulty = 'Medium'),
+    count(*) filter (where up.solved and p.difficulty = 'Hard'),
+    count(*) filter (where up.in_revision),
+    max(up.solved_at) filter (where up.solved)
+from user_progress up
+join problems p on p.id = up.problem_id
+group by up.user_id
+on conflict (user_id) do nothing;
+
+alter table user_progress_counters enable row level security;
+
+do $$ begin
+    if not exists (
+        select 1 from pg_policies where schemaname = 'public' and tablename = 'user_progress_counters' and policyname = 'Allow all on user_progress_counters'
+    ) then
+        create policy "Allow all on user_progress_counters" on user_progress_counters for all using (true) with check (true);
+    end if;
+end $$;
@@ -9,6 +9,7 @@ import bcrypt
 from app.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -37,3 +38,8 @@ def get_current_username(token: str = Depends(oauth2_scheme)) -> str:
         raise credentials_exception
 
 
+def get_optional_username(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    """Like get_current_username, but None when no token is sent (an invalid token is still a 401)"""
+    if token is None:
+        return None
+    return get_current_username(token)
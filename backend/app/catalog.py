@@ -0,0 +1,337 @@
+"""
+In-process problem catalog
+
+Problems change rarely, so the read endpoints are served from an immutable snapshot
+of the problems table instead of querying (and re-validating) every row per request.
+The snapshot is versioned by (max(updated_at), count(*), sum of updated_at): a write
+through this process rebuilds it right away, and writes from other instances are picked
+up by a cheap version probe at most every CATALOG_PROBE_INTERVAL seconds. The sum catches
+an update that committed late with a timestamp older than the newest one.
+
+solution_text is not part of the snapshot: it is the bulk of each row and only the
+solution page needs it, so it is read per problem (and cached) by solution_payload().
+Over Supabase's REST API, which can't evaluate SQL expressions, the probe reads every
+updated_at and a rebuild reads solution_text to derive has_solution.
+"""
+import bisect
+import copy
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import fetch_all_keyset, using_supabase
+from app.models import Problem
+from app.responses import JSON, EncodedPayload, dumps, encode, project, rows_as
+from app.suggest import SuggestIndex, TOP_K
+
+logger = logging.getLogger(__name__)
+
+# Columns the snapshot loads: everything but solution_text, and whether there is one
+CATALOG_COLUMNS = (
+    "id", "number", "title", "difficulty", "topics", "link", "subtopic", "updated_at",
+    "(solution_text IS NOT NULL AND solution_text <> '') AS has_solution",
+)
+# PostgREST can't compute has_solution: read solution_text, which problem_row() turns into the flag
+SUPABASE_CATALOG_COLUMNS = CATALOG_COLUMNS[:-1] + ("solution_text",)
+
+# Solution payloads kept in memory, most recently used last
+SOLUTION_CACHE_SIZE = 128
+
+def problem_row(row, with_solution: bool = False) -> dict:
+    """
+    A problems row in the shape of the Problem model, without validating it.
+    solution_text is dropped unless with_solution; has_solution is derived from it when
+    the row doesn't carry the flag.
+    """
+    problem = project(row, Problem)
+    # Older Supabase rows stored topics as a JSON-encoded string
+    if isinstance(problem['topics'], str):
+        problem['topics'] = json.loads(problem['topics'])
+    if 'has_solution' not in row:
+        problem['has_solution'] = bool(row.get('solution_text'))
+    if not with_solution:
+        del problem['solution_text']
+    return problem
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric words - the unit of the text index"""
+    return _TOKEN.findall(text.lower())
+
+def _intersect(position_lists) -> list:
+    """Intersection of ascending position lists, ascending"""
+    position_lists = sorted(position_lists, key=len)
+    result = position_lists[0]
+    for positions in position_lists[1:]:
+        if not result:
+            break
+        allowed = set(positions)
+        result = [position for position in result if position in allowed]
+    return list(result)
+
+def _bump(counts: dict, key, delta: int):
+    """Add delta to counts[key], dropping the key when it reaches zero"""
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+def _count(counts: dict, difficulty: str, delta: int):
+    counts["count"] += delta
+    _bump(counts["difficulties"], difficulty, delta)
+
+def _facet_fields(problem):
+    return (problem['difficulty'], tuple(dict.fromkeys(problem['topics'])), problem['subtopic'])
+
+def _tally(facets: dict, problem, delta: int = 1):
+    """Add (delta=1) or take out (delta=-1) one problem's counts in facets"""
+    difficulty, topics, subtopic = _facet_fields(problem)
+    facets["total"] += delta
+    _bump(facets["difficulties"], difficulty, delta)
+    for topic in topics:
+        topic_counts = facets["topics"].setdefault(topic, {"count": 0, "difficulties": {}, "subtopics": {}})
+        _count(topic_counts, difficulty, delta)
+        if subtopic:
+            subtopic_counts = topic_counts["subtopics"].setdefault(subtopic, {"count": 0, "difficulties": {}})
+            _count(subtopic_counts, difficulty, delta)
+            if not subtopic_counts["count"]:
+                del topic_counts["subtopics"][subtopic]
+        if not topic_counts["count"]:
+            del facets["topics"][topic]
+
+class CatalogSnapshot:
+    """
+    Problems (as Problem-shaped dicts) in id order plus hash indexes into that array.
+    Never mutated after construction - a rebuild swaps in a new snapshot.
+    """
+
+    __slots__ = ('version', 'problems', 'ids', 'updated_at', 'watermark', 'by_id', 'by_topic',
+                 'by_subtopic', 'by_difficulty', 'by_token', 'vocabulary', 'facets', '_rows', '_payloads')
+
+    def __init__(self, version, rows, previous=None):
+        self.version = version
+        rows = sorted(rows, key=lambda row: row['id'])
+        self.problems = tuple(problem_row(row) for row in rows)
+        self.ids = tuple(problem['id'] for problem in self.problems)
+        # Last change per problem, for incremental sync; watermark is the newest of them
+        self.updated_at = tuple(row.get('updated_at') for row in rows)
+        self.watermark = max((ts for ts in self.updated_at if ts is not None), default=None)
+        self.by_id = {}
+        by_topic, by_subtopic, by_difficulty, by_token = {}, {}, {}, {}
+        for position, problem in enumerate(self.problems):
+            self.by_id[problem['id']] = position
+            # Text index over title and topics: token -> positions
+            for token in dict.fromkeys(tokenize(' '.join([problem['title'], *problem['topics']]))):
+                by_token.setdefault(token, []).append(position)
+            for topic in dict.fromkeys(problem['topics']):
+                by_topic.setdefault(topic, []).append(position)
+            if problem['subtopic']:
+                by_subtopic.setdefault(problem['subtopic'], []).append(position)
+            by_difficulty.setdefault(problem['difficulty'], []).append(position)
+        # Positions are ascending, so every index lists problems in id order
+        self.by_topic = {key: tuple(positions) for key, positions in by_topic.items()}
+        self.by_subtopic = {key: tuple(positions) for key, positions in by_subtopic.items()}
+        self.by_difficulty = {key: tuple(positions) for key, positions in by_difficulty.items()}
+        self.by_token = {key: tuple(positions) for key, positions in by_token.items()}
+        # Sorted so every token sharing a prefix is one contiguous slice
+        self.vocabulary = tuple(sorted(self.by_token))
+        # Counts over the whole catalog: the previous snapshot's, adjusted for the problems that changed
+        self.facets = self._facets(previous)
+        self._rows = {}
+        self._payloads = {}
+
+    def rows(self, media_type: str = JSON):
+        """Every problem as rows_as() shapes it for media_type"""
+        rows = self._rows.get(media_type)
+        if rows is None:
+            rows = self._rows[media_type] = rows_as(self.problems, media_type)
+        return rows
+
+    def full_changes(self, media_type: str = JSON) -> dict:
+        """/changes without a version: every problem, as of the snapshot's newest updated_at"""
+        return {
+            "version": self.watermark.isoformat() if self.watermark else None,
+            "upserted": self.rows(media_type),
+            "deleted": [],
+        }
+
+    def _payload(self, name: str, media_type: str, content) -> EncodedPayload:
+        """content() encoded and compressed, once per snapshot, name and format"""
+        payload = self._payloads.get((name, media_type))
+        if payload is None:
+            payload = self._payloads[(name, media_type)] = EncodedPayload(
+                encode(content(), media_type), media_type, vary="Accept, Accept-Encoding"
+            )
+        return payload
+
+    def list_payload(self, media_type: str = JSON) -> EncodedPayload:
+        """The full problem list (GET /api/problems/)"""
+        return self._payload("list", media_type, lambda: self.rows(media_type))
+
+    def changes_payload(self, media_type: str = JSON) -> EncodedPayload:
+        """full_changes() (GET /api/problems/changes without a version)"""
+        return self._payload("changes", media_type, lambda: self.full_changes(media_type))
+
+    def get(self, problem_id: int):
+        position = self.by_id.get(problem_id)
+        return None if position is None else self.problems[position]
+
+    def page(self, after_id=None, limit: int = 1000, positions=None):
+        """Up to limit problems with id greater than after_id, out of positions (default: all of them)"""
+        threshold = 0 if after_id is None else bisect.bisect_right(self.ids, after_id)
+        if positions is None:
+            return self.problems[threshold:threshold + limit]
+        start = bisect.bisect_left(positions, threshold)
+        return [self.problems[position] for position in positions[start:start + limit]]
+
+    def count_facets(self, positions) -> dict:
+        """Counts per difficulty and per topic -> subtopic -> difficulty for the problems at positions"""
+        facets = {"total": 0, "difficulties": {}, "topics": {}}
+        for position in positions:
+            _tally(facets, self.problems[position])
+        return facets
+
+    def _facets(self, previous) -> dict:
+        """Whole-catalog facets, from previous's by taking out and adding back only changed problems"""
+        if previous is None:
+            return self.count_facets(range(len(self.problems)))
+        facets = copy.deepcopy(previous.facets)
+        for problem in self.problems:
+            old = previous.get(problem['id'])
+            if old is None:
+                _tally(facets, problem)
+            elif _facet_fields(old) != _facet_fields(problem):
+                _tally(facets, old, -1)
+                _tally(facets, problem)
+        for problem in previous.problems:
+            if problem['id'] not in self.by_id:
+                _tally(facets, problem, -1)
+        return facets
+
+    def _prefix_positions(self, prefix: str) -> list:
+        """Positions of problems with any token starting with prefix"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+        if end - start == 1:
+            return self.by_token[self.vocabulary[start]]
+        return sorted({position for token in self.vocabulary[start:end] for position in self.by_token[token]})
+
+    def changed_since(self, since) -> list:
+        """Problems created or updated after since"""
+        return [problem for problem, updated_at in zip(self.problems, self.updated_at)
+                if updated_at is not None and updated_at > since]
+
+    def match(self, text=None, topic=None, subtopic=None, difficulty=None, ids=None, exclude_ids=None) -> list:
+        """
+        Positions (ascending, i.e. in id order) of problems matching every given filter.
+        Each word of text must prefix a word of the title or topics. ids / exclude_ids
+        restrict by problem id, e.g. to problems with a company tag or a user's solved set.
+        """
+        position_lists = [
+            index.get(key, ())
+            for index, key in ((self.by_topic, topic), (self.by_subtopic, subtopic), (self.by_difficulty, difficulty))
+            if key is not None
+        ]
+        position_lists.extend(self._prefix_positions(token) for token in tokenize(text or ''))
+        if ids is not None:
+            position_lists.append(sorted(self.by_id[i] for i in set(ids) if i in self.by_id))
+        selected = _intersect(position_lists) if position_lists else range(len(self.problems))
+        if exclude_ids:
+            excluded = {self.by_id[i] for i in exclude_ids if i in self.by_id}
+            selected = [position for position in selected if position not in excluded]
+        return list(selected)
+
+    def find(self, **filters) -> list:
+        """Problems matching every given filter (see match()), in id order"""
+        return [self.problems[position] for position in self.match(**filters)]
+
+_snapshot = None
+_checked_at = 0.0
+# Typeahead index; kept across snapshots and updated for the problems that changed
+_suggest_index = SuggestIndex()
+# (problem id, updated_at) -> EncodedPayload of its solution
+_solutions = OrderedDict()
+
+async def _probe(db):
+    """Current catalog version - one aggregate row, no problem data"""
+    if using_supabase():
+        # No expressions over REST: fold the timestamps here instead
+        response = await db.table("problems").select("updated_at").execute()
+        stamps = [row['updated_at'] for row in response.data if row['updated_at'] is not None]
+        return (max(stamps, default=None), len(response.data), sum(ts.timestamp() for ts in stamps))
+    response = await (
+        db.table("problems").select("sum(extract(epoch from updated_at)) AS checksum")
+        .max("updated_at").count().execute()
+    )
+    row = response.data[0]
+    return (row['max'], row['count'], row['checksum'])
+
+async def _rebuild(db, version=None) -> CatalogSnapshot:
+    global _snapshot, _checked_at
+    if version is None:
+        version = await _probe(db)
+    columns = SUPABASE_CATALOG_COLUMNS if using_supabase() else CATALOG_COLUMNS
+    rows = await fetch_all_keyset(lambda: db.table("problems").select(*columns))
+    snapshot = CatalogSnapshot(version, rows, previous=_snapshot)
+    # Render and compress the default-format list and changes here, off the event loop,
+    # rather than in the first request for them
+    await run_in_threadpool(lambda: (snapshot.list_payload(), snapshot.changes_payload()))
+    _suggest_index.sync(snapshot.problems)
+    _snapshot, _checked_at = snapshot, time.monotonic()
+    logger.info("Problem catalog loaded: %d problems", len(snapshot.problems))
+    return snapshot
+
+async def get_catalog(db) -> CatalogSnapshot:
+    """The current snapshot, reloaded first if the version probe shows the table changed"""
+    global _checked_at
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _checked_at < settings.CATALOG_PROBE_INTERVAL:
+        return snapshot
+    version = await _probe(db)
+    if snapshot is not None and snapshot.version == version:
+        _checked_at = time.monotonic()
+        return snapshot
+    return await _rebuild(db, version)
+
+async def refresh_catalog(db):
+    """Rebuild after a write through this process; if that fails the next read reloads"""
+    global _snapshot
+    try:
+        await _rebuild(db)
+    except Exception:
+        logger.exception("Problem catalog rebuild failed")
+        _snapshot = None
+
+def suggest(catalog: CatalogSnapshot, query: str, limit: int = TOP_K) -> list:
+    """Typeahead matches for query (title, link slug or number prefix), best first"""
+    problems = (catalog.get(problem_id) for problem_id in _suggest_index.suggest(query, limit))
+    return [problem for problem in problems if problem is not None]
+
+async def solution_payload(db, catalog: CatalogSnapshot, problem_id: int):
+    """
+    {id, solution_text} of one problem as an EncodedPayload, or None if there is no such problem.
+    Cached by the problem's updated_at in the snapshot, so an edit is never served stale.
+    """
+    position = catalog.by_id.get(problem_id)
+    if position is None:
+        return None
+    key = (problem_id, catalog.updated_at[position])
+    payload = _solutions.get(key)
+    if payload is not None:
+        _solutions.move_to_end(key)
+        return payload
+    response = await db.table("problems").select("solution_text").eq("id", problem_id).execute()
+    if not response.data:
+        return None
+    payload = EncodedPayload(dumps({"id": problem_id, "solution_text": response.data[0]['solution_text']}))
+    _solutions[key] = payload
+    while len(_solutions) > SOLUTION_CACHE_SIZE:
+        _solutions.popitem(last=False)
+    return payload
@@ -14,6 +14,31 @@ class Settings:
     RDS_USER: str = os.getenv("RDS_USER", "")
     RDS_PASSWORD: str = os.getenv("RDS_PASSWORD", "")
     
+    # psycopg2 connection pool: sizing, checkout timeout (seconds) and wait queue bound,
+    # connection max lifetime, and idle time after which a connection is pinged before use
+    DB_POOL_MIN: int = int(os.getenv("DB_POOL_MIN", "1"))
+    DB_POOL_MAX: int = int(os.getenv("DB_POOL_MAX", "5"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_MAX_WAITERS: int = int(os.getenv("DB_POOL_MAX_WAITERS", "64"))
+    DB_POOL_MAX_LIFETIME: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+    DB_POOL_PRE_PING_AFTER: float = float(os.getenv("DB_POOL_PRE_PING_AFTER", "30"))
+    
+    # Query engine for request handlers: "sync" (psycopg2 in a threadpool) or "async" (asyncpg)
+    DB_ENGINE: str = os.getenv("DB_ENGINE", "sync").lower()
+    DB_ASYNC_POOL_MIN: int = int(os.getenv("DB_ASYNC_POOL_MIN", "1"))
+    DB_ASYNC_POOL_MAX: int = int(os.getenv("DB_ASYNC_POOL_MAX", "10"))
+    # Compiled statement cache; server-side PREPARE can be turned off for poolers that don't support it
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+    DB_PREPARED_STATEMENTS: bool = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+    # insert() of this many rows or more is sent with COPY FROM STDIN instead of a VALUES list
+    DB_COPY_THRESHOLD: int = int(os.getenv("DB_COPY_THRESHOLD", "500"))
+    
+    # Seconds between version probes of the in-process problem catalog and tag map (0 probes on every read)
+    CATALOG_PROBE_INTERVAL: float = float(os.getenv("CATALOG_PROBE_INTERVAL", "5"))
+    # Seconds /api/problems/changes looks back before `since`: updated_at is taken when a
+    # writer's transaction starts, so a slow writer can commit a timestamp older than a version
+    CATALOG_CHANGES_GRACE: float = float(os.getenv("CATALOG_CHANGES_GRACE", "60"))
+    
     # Supabase settings (fallback)
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
@@ -3,7 +3,11 @@ Database connection - supports both RDS and Supabase
 """
 import os
 import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+
+from app.config import settings
 
 # Load .env file only for local development
 # In Lambda, environment variables are set directly, so we don't want to override them
@@ -56,3 +60,112 @@ def get_supabase():
         
         return _supabase_client
 
+def using_supabase() -> bool:
+    """Whether the API reaches the database through Supabase's REST API (RDS_HOST unset)"""
+    return not os.getenv("RDS_HOST")
+
+def column_values(response, column: str) -> list:
+    """Values of one column from a query response; skips building row dicts when the client allows it"""
+    if hasattr(response, "column"):
+        return response.column(column)
+    return [row[column] for row in response.data]
+
+async def fetch_all_keyset(make_query, key: str = "id", page_size: int = 1000) -> list:
+    """
+    Read every row of make_query() (a fresh select builder per call) in pages ordered by key.
+    Pages continue from the last key seen instead of using OFFSET, so later pages cost the
+    same as the first and rows can't be skipped or repeated while the table changes.
+    """
+    rows = []
+    last_key = None
+    while True:
+        response = await make_query().after(key, last_key).limit(page_size).execute()
+        page = response.data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last_key = page[-1][key]
+
+class _ThreadedQuery:
+    """Wraps a blocking query builder so execute() can be awaited without blocking the event loop"""
+    
+    def __init__(self, query):
+        self._query = query
+    
+    def _wrap(self, result):
+        # Keep wrapping builders so chains like .select().eq().execute() stay awaitable
+        return _ThreadedQuery(result) if hasattr(result, "execute") else result
+    
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return self._wrap(attr)
+        
+        def chain(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs))
+        return chain
+    
+    async def execute(self):
+        return await run_in_threadpool(self._query.execute)
+    
+    def stream(self, batch_size: int = 1000):
+        """Async iterator over the blocking client's stream(); each batch is fetched in the threadpool"""
+        return iterate_in_threadpool(self._query.stream(batch_size))
+
+class _ThreadedClient:
+    """
+    Awaitable facade over a blocking client: an RDSSession, the psycopg2 RDS client,
+    or Supabase (through SupabaseClient). Transactions are only real for an RDSSession; on the others
+    transaction() is a no-op and each statement commits on its own.
+    """
+    
+    def __init__(self, client, session: bool = False):
+        self._client = client
+        self._session = session
+    
+    def table(self, table_name: str):
+        return _ThreadedQuery(self._client.table(table_name))
+    
+    @asynccontextmanager
+    async def transaction(self):
+        if not self._session or not await run_in_threadpool(self._client.begin):
+            yield self
+            return
+        try:
+            yield self
+        except BaseException:
+            await run_in_threadpool(self._client.rollback)
+            raise
+        await run_in_threadpool(self._client.commit)
+    
+    async def close(self):
+        if self._session:
+            await run_in_threadpool(self._client.close)
+
+def open_session():
+    """
+    Open a unit of work: an awaitable client whose statements share one connection
+    (checked out lazily) and can be grouped with `async with db.transaction():`.
+    Must be closed with `await db.close()`.
+    """
+    if os.getenv("RDS_HOST"):
+        if settings.DB_ENGINE == "async":
+            from app.database_async import AsyncRDSSession
+            return AsyncRDSSession()
+        from app.database_rds import RDSSession
+        return _ThreadedClient(RDSSession(), session=True)
+    # Joins, aggregates and keyset pages are computed in process (see app.database_supabase)
+    from app.database_supabase import SupabaseClient
+    return _ThreadedClient(SupabaseClient(get_supabase()))
+
+async def get_db():
+    """
+    FastAPI dependency - one database session per request.
+    Multi-statement endpoints reuse a single pooled connection and can commit once
+    by wrapping their writes in `async with db.transaction():`.
+    """
+    db = open_session()
+    try:
+        yield db
+    finally:
+        await db.close()
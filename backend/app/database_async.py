@@ -0,0 +1,255 @@
+"""
+Async database engine for AWS RDS PostgreSQL (asyncpg)
+
+Uses the same builder API as app.database_rds, but execute() is awaitable and
+runs on its own asyncpg pool so queries never block the event loop.
+"""
+import asyncio
+import io
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+
+import asyncpg
+
+from app.config import settings
+from app.database_rds import get_db_config, RDSClient, QueryBuilder, Response
+
+# Async connection pool for RDS - bound to the event loop that created it
+_pool = None
+_pool_loop = None
+_pool_lock = None
+
+class _PooledConnection(asyncpg.Connection):
+    """asyncpg connection that knows its age, for DB_POOL_MAX_LIFETIME"""
+    __slots__ = ('created_at',)
+
+def _encode_json(value):
+    """JSONB encoder - values already serialized by the builder pass through"""
+    return value if isinstance(value, str) else json.dumps(value)
+
+def _encode_date(value):
+    """DATE encoder - accepts ISO strings (as the routers send) or date objects"""
+    return value if isinstance(value, str) else value.isoformat()
+
+async def _init_connection(conn):
+    """Register codecs so rows match what psycopg2 returns"""
+    conn.created_at = time.monotonic()
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(
+            type_name, encoder=_encode_json, decoder=json.loads, schema='pg_catalog'
+        )
+    await conn.set_type_codec(
+        'date', encoder=_encode_date, decoder=date.fromisoformat,
+        schema='pg_catalog', format='text'
+    )
+
+def _abandon_pool(pool, loop):
+    """
+    Close a pool created on another event loop. Its connections belong to that loop: a
+    running loop closes them itself and an idle one lets terminate() abort them. Once the
+    loop is closed nothing can run there; the sockets close when the pool is collected.
+    """
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+    elif not loop.is_closed():
+        pool.terminate()
+
+async def init_async_pool():
+    """Initialize the async connection pool (once per event loop)"""
+    global _pool, _pool_loop, _pool_lock
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    if _pool_lock is None or _pool_loop is not loop:
+        if _pool is not None:
+            _abandon_pool(_pool, _pool_loop)
+        _pool_lock = asyncio.Lock()
+        _pool_loop = loop
+        _pool = None
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                min_size=settings.DB_ASYNC_POOL_MIN,
+                max_size=settings.DB_ASYNC_POOL_MAX,
+                init=_init_connection,
+                connection_class=_PooledConnection,
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE if settings.DB_PREPARED_STATEMENTS else 0,
+                **get_db_config()
+            )
+    return _pool
+
+async def _checkout(pool):
+    """
+    Check out a connection, waiting at most DB_POOL_TIMEOUT seconds. One older than
+    DB_POOL_MAX_LIFETIME is closed instead (the pool reconnects its slot) and another taken.
+    """
+    while True:
+        conn = await pool.acquire(timeout=settings.DB_POOL_TIMEOUT)
+        if time.monotonic() - conn.created_at < settings.DB_POOL_MAX_LIFETIME:
+            return conn
+        await conn.close()
+
+@asynccontextmanager
+async def acquire():
+    """Check out an async connection for the duration of the block"""
+    pool = _pool
+    conn = await _checkout(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+def get_async_pool_stats() -> dict:
+    """Size counters for the async pool (empty until it is first used)"""
+    if _pool is None:
+        return {}
+    return {
+        "size": _pool.get_size(),
+        "max_size": _pool.get_max_size(),
+        "idle": _pool.get_idle_size(),
+        "in_use": _pool.get_size() - _pool.get_idle_size(),
+    }
+
+async def close_async_pool():
+    """Close the async connection pool if it was created"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def _records_response(rows) -> Response:
+    """asyncpg Records are already compact tuples with shared column metadata"""
+    return Response(columns=rows[0].keys() if rows else (), rows=rows)
+
+class AsyncQueryBuilder(QueryBuilder):
+    """Query builder with an awaitable execute()"""
+
+    @asynccontextmanager
+    async def _async_connection(self):
+        """The session's connection when bound to one, otherwise a pooled connection for this statement"""
+        if self.session is not None:
+            yield await self.session.connection()
+        else:
+            await init_async_pool()
+            async with acquire() as conn:
+                yield conn
+
+    async def execute(self):
+        """
+        Execute the query on the async pool.
+        asyncpg prepares statements per connection and caches them by SQL text, so
+        reusing the cached statement text gets server-side prepared plans too.
+        """
+        if self._use_copy():
+            return await self._execute_copy()
+        statement, params = self.compile()
+        async with self._async_connection() as conn:
+            rows = await conn.fetch(statement.dollar_sql, *params)
+        return _records_response(rows)
+
+    async def stream(self, batch_size: int = 1000):
+        """
+        Async generator over a server-side cursor, yielding rows in lists of up to batch_size.
+        On a session the cursor uses the session's connection and transaction, as QueryBuilder.stream().
+        """
+        self._check_streamable()
+        statement, params = self.compile()
+        # asyncpg cursors only live inside a transaction
+        if self.session is not None:
+            async with self.session.transaction():
+                conn = await self.session.connection()
+                async for rows in self._fetch_batches(conn, statement, params, batch_size):
+                    yield rows
+            return
+        await init_async_pool()
+        async with acquire() as conn:
+            async with conn.transaction():
+                async for rows in self._fetch_batches(conn, statement, params, batch_size):
+                    yield rows
+
+    @staticmethod
+    async def _fetch_batches(conn, statement, params, batch_size: int):
+        cursor = await conn.cursor(statement.dollar_sql, *params)
+        while True:
+            rows = await cursor.fetch(batch_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+
+    async def _execute_copy(self):
+        """Bulk insert through COPY FROM STDIN in a single transaction"""
+        create, staging, _, insert = self._copy_statements()
+        async with self._async_connection() as conn:
+            # Becomes a savepoint when the session already has a transaction open
+            async with conn.transaction():
+                await conn.execute(create)
+                await conn.copy_to_table(
+                    staging,
+                    source=io.BytesIO(self._copy_data().encode('utf-8')),
+                    columns=self.insert_columns,
+                    format='csv',
+                )
+                rows = await conn.fetch(insert)
+        return _records_response(rows)
+
+class AsyncRDSClient(RDSClient):
+    """RDS client whose queries are awaited"""
+
+    def _query(self, *args):
+        query = AsyncQueryBuilder(self.table_name, *args)
+        query.session = self.session
+        return query
+
+class AsyncRDSSession:
+    """
+    Unit of work on the async pool: one connection, checked out on first use, shared by
+    every statement until close(). Statements inside `async with session.transaction():`
+    commit once at the end.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._pool = None
+        self._transaction = None
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction is not None
+
+    async def connection(self):
+        if self._conn is None:
+            self._pool = await init_async_pool()
+            self._conn = await _checkout(self._pool)
+        return self._conn
+
+    def table(self, table_name: str):
+        """Client whose queries run on this session's connection"""
+        return AsyncRDSClient(table_name, session=self)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Group statements into one transaction; nested calls join the outer one"""
+        if self._transaction is not None:
+            yield self
+            return
+        conn = await self.connection()
+        self._transaction = conn.transaction()
+        await self._transaction.start()
+        try:
+            yield self
+        except BaseException:
+            await self._transaction.rollback()
+            raise
+        else:
+            await self._transaction.commit()
+        finally:
+            self._transaction = None
+
+    async def close(self):
+        """Return the connection to the pool (asyncpg rolls back anything left open)"""
+        conn, self._conn = self._conn, None
+        self._transaction = None
+        if conn is not None:
+            await self._pool.release(conn)
@@ -0,0 +1,197 @@
+"""
+Connection pool for the psycopg2 RDS client
+
+Replaces psycopg2's ThreadedConnectionPool, which raises as soon as every
+connection is checked out and never checks whether an idle connection is still
+alive (e.g. after a Lambda freeze/thaw). This pool:
+- waits for a free connection (bounded number of waiters, with a timeout)
+- pings connections that sat idle before handing them out
+- closes connections older than the max lifetime
+- keeps counters for /debug/database
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.pool import PoolError
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeout(PoolError):
+    """No connection became available within the checkout timeout"""
+
+class PoolExhausted(PoolError):
+    """All connections are in use and the wait queue is full"""
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with a bounded wait queue"""
+
+    def __init__(self, min_size: int, max_size: int, timeout: float, max_waiters: int,
+                 max_lifetime: float, pre_ping_after: float, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.max_lifetime = max_lifetime
+        self.pre_ping_after = pre_ping_after
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        # Idle connections as (conn, last_used); most recently used at the right
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        # Counters
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recycled = 0
+        self.stale_discarded = 0
+
+        for _ in range(min_size):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        self._created_at[conn] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(conn, None)
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _expired(self, conn, now: float) -> bool:
+        return bool(self.max_lifetime) and now - self._created_at.get(conn, now) > self.max_lifetime
+
+    def _is_alive(self, conn) -> bool:
+        """Cheap round-trip to detect connections the server or network dropped"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a connection, waiting up to `timeout` seconds for one to free up"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    last_used = None
+                    break
+                if self._waiting >= self.max_waiters:
+                    self.checkout_failures += 1
+                    raise PoolExhausted(f"connection pool exhausted ({self.max_size} in use, {self._waiting} waiting)")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.checkout_failures += 1
+                    raise PoolTimeout(f"no database connection available after {self.timeout:.1f}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            conn = self._prepare_checkout(conn, last_used)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self.checkout_failures += 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return conn
+
+    def _prepare_checkout(self, conn, last_used):
+        """Open a new connection, or validate an idle one (lifetime, then pre-ping)"""
+        if conn is None:
+            return self._connect()
+        now = time.monotonic()
+        if conn.closed or self._expired(conn, now):
+            with self._cond:
+                self.recycled += 1
+            self._discard(conn)
+            return self._connect()
+        if now - last_used >= self.pre_ping_after and not self._is_alive(conn):
+            logger.info("Discarding stale database connection")
+            with self._cond:
+                self.stale_discarded += 1
+            self._discard(conn)
+            return self._connect()
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection; broken, expired or surplus connections are closed"""
+        if not close and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._cond:
+            self._in_use -= 1
+            if close or conn.closed or self._closed or self._expired(conn, time.monotonic()):
+                self._size -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection; checked-out connections are closed when returned"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 3),
+                "recycled": self.recycled,
+                "stale_discarded": self.stale_discarded,
+            }
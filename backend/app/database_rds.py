@@ -1,16 +1,40 @@
 """
 Database connection for AWS RDS PostgreSQL
 """
+import io
 import os
+import threading
+import uuid
+from collections import OrderedDict
 import psycopg2
+import psycopg2.extras
+from psycopg2 import errors
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import ThreadedConnectionPool
 from contextlib import contextmanager
 from typing import Generator
 import json
 
+from app.config import settings
+from app.database_pool import ConnectionPool
+
 # Connection pool for RDS
 _pool = None
+_pool_lock = threading.Lock()
+
+# Decoder for json/jsonb columns, so routers receive Python lists/dicts directly
+_json_loads = json.loads
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which server-side prepared statements it holds"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Names of the statements prepared on this connection, least recently used first
+        self.prepared = OrderedDict()
+        # Set when a prepared statement failed inside a transaction; cleaned up on next use
+        self.stale_statements = False
+        psycopg2.extras.register_default_json(self, loads=_json_loads)
+        psycopg2.extras.register_default_jsonb(self, loads=_json_loads)
 
 def get_db_config():
     """Get database configuration from environment variables"""
@@ -23,17 +47,28 @@ def get_db_config():
     }
 
 def init_pool():
-    """Initialize connection pool"""
+    """Initialize connection pool (sized and tuned from settings)"""
     global _pool
     if _pool is None:
-        config = get_db_config()
-        _pool = ThreadedConnectionPool(
-            minconn=1,
-            maxconn=5,
-            **config
-        )
+        with _pool_lock:
+            if _pool is None:
+                config = get_db_config()
+                _pool = ConnectionPool(
+                    min_size=settings.DB_POOL_MIN,
+                    max_size=settings.DB_POOL_MAX,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_waiters=settings.DB_POOL_MAX_WAITERS,
+                    max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                    pre_ping_after=settings.DB_POOL_PRE_PING_AFTER,
+                    connection_factory=PreparingConnection,
+                    **config
+                )
     return _pool
 
+def get_pool_stats() -> dict:
+    """Counters for the connection pool (empty until it is first used)"""
+    return _pool.stats() if _pool is not None else {}
+
 @contextmanager
 def get_db_connection() -> Generator[psycopg2.extensions.connection, None, None]:
     """Get a database connection from the pool"""
@@ -42,6 +77,7 @@ def get_db_connection() -> Generator[psycopg2.extensions.connection, None, None]
     try:
         yield conn
     finally:
+        # The pool rolls back anything left open, so aborted transactions are never reused
         pool.putconn(conn)
 
 def get_db_cursor(conn=None):
@@ -52,31 +88,129 @@ def get_db_cursor(conn=None):
         with get_db_connection() as conn:
             return conn.cursor(cursor_factory=RealDictCursor)
 
+class RDSSession:
+    """
+    Unit of work: one pooled connection shared by a sequence of statements (e.g. one request).
+    The connection is checked out on first use. Outside transaction() each statement
+    commits on its own (autocommit, no extra round-trips); inside it, statements share
+    one transaction that commits once.
+    """
+    
+    def __init__(self):
+        self._conn = None
+        self.in_transaction = False
+    
+    def connection(self):
+        if self._conn is None:
+            self._conn = init_pool().getconn()
+            self._conn.autocommit = True
+        return self._conn
+    
+    def table(self, table_name: str):
+        """Client whose queries run on this session's connection"""
+        return RDSClient(table_name, session=self)
+    
+    def begin(self) -> bool:
+        """Start a transaction; returns False if one is already open (the caller joins it)"""
+        if self.in_transaction:
+            return False
+        self.connection().autocommit = False
+        self.in_transaction = True
+        return True
+    
+    def _end(self, commit: bool):
+        conn = self._conn
+        self.in_transaction = False
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
+        conn.autocommit = True
+    
+    def commit(self):
+        self._end(commit=True)
+    
+    def rollback(self):
+        self._end(commit=False)
+    
+    @contextmanager
+    def transaction(self):
+        """Group statements into one transaction; nested calls join the outer one"""
+        if not self.begin():
+            yield self
+            return
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+    
+    def close(self):
+        """Return the connection to the pool, rolling back anything uncommitted"""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        broken = False
+        try:
+            if self.in_transaction:
+                conn.rollback()
+            conn.autocommit = False
+        except psycopg2.Error:
+            broken = True
+        self.in_transaction = False
+        init_pool().putconn(conn, close=broken)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
 class RDSClient:
     """RDS client that mimics Supabase client interface"""
     
-    def __init__(self, table_name: str):
+    def __init__(self, table_name: str, session=None):
         self.table_name = table_name
+        self.session = session
+    
+    def _query(self, *args):
+        """Create the query builder for this client - overridden by the async client"""
+        query = QueryBuilder(self.table_name, *args)
+        query.session = self.session
+        return query
     
     def select(self, *columns):
         """Start a SELECT query"""
-        return QueryBuilder(self.table_name, 'select', columns)
+        return self._query('select', columns)
     
     def insert(self, data):
         """Start an INSERT query - returns a query builder"""
-        return QueryBuilder(self.table_name, 'insert', None, None, data)
+        return self._query('insert', None, None, data)
+    
+    def upsert(self, data, on_conflict, update_columns=None, ignore_duplicates: bool = False):
+        """
+        Start an INSERT ... ON CONFLICT query (one row or a list of rows).
+        on_conflict is a list of columns or a comma-separated string, as in Supabase.
+        update_columns defaults to every inserted column outside the conflict target.
+        """
+        query = self._query('upsert', None, None, data)
+        query.on_conflict = [c.strip() for c in on_conflict.split(',')] if isinstance(on_conflict, str) else list(on_conflict)
+        query.update_columns = list(update_columns) if update_columns is not None else None
+        query.ignore_duplicates = ignore_duplicates
+        return query
     
     def update(self, data):
         """Start an UPDATE query"""
-        return QueryBuilder(self.table_name, 'update', None, data)
+        return self._query('update', None, data)
     
     def delete(self):
         """Start a DELETE query"""
-        return QueryBuilder(self.table_name, 'delete')
+        return self._query('delete')
     
     def table(self, table_name: str):
         """Create a new client for a different table"""
-        return RDSClient(table_name)
+        return type(self)(table_name, session=self.session)
 
 class QueryBuilder:
     """Query builder that mimics Supabase query interface"""
@@ -84,29 +218,62 @@ class QueryBuilder:
     def __init__(self, table_name: str, operation: str, columns=None, update_data=None, insert_data=None):
         self.table_name = table_name
         self.operation = operation
-        self.columns = columns or ['*']
+        self.columns = list(columns) if columns else ['*']
         self.update_data = update_data
-        self.insert_data = insert_data
+        # insert() accepts a single row or a list of rows
+        self.insert_rows = [insert_data] if isinstance(insert_data, dict) else list(insert_data or [])
+        self.insert_columns = list(dict.fromkeys(key for row in self.insert_rows for key in row))
+        # Set by RDSClient.upsert()
+        self.on_conflict = None
+        self.update_columns = None
+        self.ignore_duplicates = False
+        # Conditions use %s placeholders; params are kept in the same order
         self.conditions = []
         self.params = []
-        self.param_counter = 1
         self.limit_val = None
         self.offset_val = None
         self.order_by = None
+        self.joins = []
+        self.group_by_columns = []
+        self.lock_rows = False
         self._negate_next = False
+        # RDSSession to run on; None checks out a pooled connection per statement
+        self.session = None
     
     def eq(self, column: str, value):
         """Add equality condition"""
-        self.conditions.append(f"{column} = ${self.param_counter}")
+        self.conditions.append(f"{column} = %s")
         self.params.append(value)
-        self.param_counter += 1
         return self
     
     def neq(self, column: str, value):
         """Add not-equal condition"""
-        self.conditions.append(f"{column} != ${self.param_counter}")
+        self.conditions.append(f"{column} != %s")
+        self.params.append(value)
+        return self
+    
+    def gt(self, column: str, value):
+        """Add greater-than condition"""
+        self.conditions.append(f"{column} > %s")
+        self.params.append(value)
+        return self
+    
+    def gte(self, column: str, value):
+        """Add greater-than-or-equal condition"""
+        self.conditions.append(f"{column} >= %s")
+        self.params.append(value)
+        return self
+    
+    def lt(self, column: str, value):
+        """Add less-than condition"""
+        self.conditions.append(f"{column} < %s")
+        self.params.append(value)
+        return self
+    
+    def lte(self, column: str, value):
+        """Add less-than-or-equal condition"""
+        self.conditions.append(f"{column} <= %s")
         self.params.append(value)
-        self.param_counter += 1
         return self
     
     def is_(self, column: str, value):
@@ -117,9 +284,8 @@ class QueryBuilder:
         if value == "null":
             self.conditions.append(f"{column} IS {negate}NULL")
         else:
-            self.conditions.append(f"{column} IS {negate}${self.param_counter}")
+            self.conditions.append(f"{column} IS {negate}%s")
             self.params.append(value)
-            self.param_counter += 1
         return self
     
     def not_(self):
@@ -129,14 +295,25 @@ class QueryBuilder:
         return self
     
     def in_(self, column: str, values: list):
-        """Add IN condition"""
-        # Use %s placeholders directly for psycopg2
-        placeholders = ', '.join(['%s'] * len(values))
-        self.conditions.append(f"{column} IN ({placeholders})")
-        self.params.extend(values)
-        self.param_counter += len(values)
+        """Add IN condition - bound as one array (column = ANY(%s)), so every list length shares a statement"""
+        self.conditions.append(f"{column} = ANY(%s)")
+        self.params.append(list(values))
+        return self
+    
+    def limit(self, count: int):
+        """Add LIMIT"""
+        self.limit_val = count
         return self
     
+    def after(self, column: str, value):
+        """
+        Keyset pagination: rows whose column is greater than value, in column order.
+        Unlike range(), the cost does not grow with page depth. Pass value=None for the first page.
+        """
+        if value is not None:
+            self.gt(column, value)
+        return self.order(column)
+    
     def range(self, start: int, end: int):
         """Add LIMIT and OFFSET"""
         self.limit_val = end - start + 1
@@ -148,114 +325,418 @@ class QueryBuilder:
         self.order_by = f"{column} {'DESC' if desc else 'ASC'}"
         return self
     
-    def execute(self):
-        """Execute the query"""
-        with get_db_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            if self.operation == 'select':
-                columns_str = ', '.join(self.columns) if isinstance(self.columns, list) else '*'
-                query = f"SELECT {columns_str} FROM {self.table_name}"
-                
-                if self.conditions:
-                    # Replace $1, $2, etc. with %s for psycopg2
-                    where_clause = ' AND '.join(self.conditions)
-                    # Replace $1, $2, $3... with %s (but not other $ characters)
-                    import re
-                    where_clause = re.sub(r'\$\d+', '%s', where_clause)
-                    query += f" WHERE {where_clause}"
-                
-                if self.order_by:
-                    query += f" ORDER BY {self.order_by}"
-                
-                if self.limit_val:
-                    query += f" LIMIT {self.limit_val}"
-                if self.offset_val:
-                    query += f" OFFSET {self.offset_val}"
-                
-                cursor.execute(query, self.params)
-                results = cursor.fetchall()
-                cursor.close()
-                return Response([dict(row) for row in results])
-            
-            elif self.operation == 'update':
-                # Build SET clause
-                set_parts = []
-                update_values = []
-                param_idx = 1
-                for key, value in self.update_data.items():
-                    if isinstance(value, (list, dict)):
-                        update_values.append(json.dumps(value))
-                    else:
-                        update_values.append(value)
-                    set_parts.append(f"{key} = %s")
-                
-                query = f"UPDATE {self.table_name} SET {', '.join(set_parts)}"
-                
-                # Add WHERE clause
-                if self.conditions:
-                    where_clause = ' AND '.join(self.conditions)
-                    # Replace $1, $2, $3... with %s (but not other $ characters)
-                    import re
-                    where_clause = re.sub(r'\$\d+', '%s', where_clause)
-                    query += f" WHERE {where_clause}"
-                    update_values.extend(self.params)
-                
-                query += " RETURNING *"
-                cursor.execute(query, update_values)
-                conn.commit()
-                results = cursor.fetchall()
-                cursor.close()
-                return Response([dict(row) for row in results])
+    def join(self, table: str, column: str, foreign_column: str = "id"):
+        """Inner join: rows where <this table>.column = table.foreign_column"""
+        self.joins.append(f" JOIN {table} ON {self.table_name}.{column} = {table}.{foreign_column}")
+        return self
+    
+    def count(self, column: str = "*", alias: str = "count"):
+        """Select count(column); use with group_by() for a count per group"""
+        return self._aggregate("count", column, alias)
+    
+    def max(self, column: str, alias: str = "max"):
+        """Select max(column); use with group_by() for a maximum per group"""
+        return self._aggregate("max", column, alias)
+    
+    def array_agg(self, column: str, alias: str = "array_agg"):
+        """Select array_agg(column), sorted; use with group_by() for a list per group"""
+        return self._aggregate("array_agg", f"{column} ORDER BY {column}", alias)
+    
+    def _aggregate(self, function: str, column: str, alias: str):
+        # A bare select() means only the aggregate is wanted, not every column
+        if self.columns == ['*']:
+            self.columns = []
+        self.columns.append(f"{function}({column}) AS {alias}")
+        return self
+    
+    def group_by(self, *columns):
+        """Add GROUP BY columns"""
+        self.group_by_columns.extend(columns)
+        return self
+    
+    def for_update(self):
+        """Lock the selected rows until the end of the transaction (SELECT ... FOR UPDATE)"""
+        self.lock_rows = True
+        return self
+    
+    def _where(self):
+        """Build the WHERE clause (empty string when there are no conditions)"""
+        if not self.conditions:
+            return ""
+        return " WHERE " + ' AND '.join(self.conditions)
+    
+    def _shape(self):
+        """Cache key for the statement - everything that affects the SQL text, but not the values"""
+        return (
+            self.table_name,
+            self.operation,
+            tuple(self.columns),
+            tuple(self.joins),
+            tuple(self.conditions),
+            tuple(self.group_by_columns),
+            self.order_by,
+            self.limit_val is not None,
+            bool(self.offset_val),
+            self.lock_rows,
+            tuple(self.update_data) if self.update_data else None,
+            tuple(self.insert_columns) if self.insert_rows else None,
+            self._on_conflict(),
+        )
+    
+    def _build_sql(self) -> str:
+        """
+        Build the SQL statement for this query shape.
+        Placeholders are psycopg2-style %s; every write returns the affected rows.
+        """
+        if self.operation == 'select':
+            columns_str = ', '.join(self.columns)
+            query = f"SELECT {columns_str} FROM {self.table_name}" + ''.join(self.joins) + self._where()
             
-            elif self.operation == 'insert':
-                if not self.insert_data:
-                    raise ValueError("Insert data is required")
-                
-                columns = ', '.join(self.insert_data.keys())
-                placeholders = ', '.join(['%s'] * len(self.insert_data))
-                values = list(self.insert_data.values())
-                
-                # Handle JSON fields
-                for i, (key, value) in enumerate(self.insert_data.items()):
-                    if isinstance(value, (list, dict)):
-                        values[i] = json.dumps(value)
-                
-                # For problem_company_tags, use ON CONFLICT DO NOTHING to handle duplicates
-                if self.table_name == 'problem_company_tags':
-                    query = f"""INSERT INTO {self.table_name} ({columns}) 
-                              VALUES ({placeholders}) 
-                              ON CONFLICT (problem_id, tag_id) DO NOTHING
-                              RETURNING *"""
-                else:
-                    query = f"INSERT INTO {self.table_name} ({columns}) VALUES ({placeholders}) RETURNING *"
-                
-                cursor.execute(query, values)
+            if self.group_by_columns:
+                query += f" GROUP BY {', '.join(self.group_by_columns)}"
+            if self.order_by:
+                query += f" ORDER BY {self.order_by}"
+            if self.limit_val is not None:
+                query += " LIMIT %s"
+            if self.offset_val:
+                query += " OFFSET %s"
+            if self.lock_rows:
+                query += " FOR UPDATE"
+            return query
+        
+        elif self.operation == 'update':
+            # Build SET clause
+            set_parts = [f"{key} = %s" for key in self.update_data]
+            query = f"UPDATE {self.table_name} SET {', '.join(set_parts)}" + self._where()
+            return query + " RETURNING *"
+        
+        elif self.operation in ('insert', 'upsert'):
+            # One multi-row VALUES list for all rows
+            columns = ', '.join(self.insert_columns)
+            row_placeholders = '(' + ', '.join(['%s'] * len(self.insert_columns)) + ')'
+            values = ', '.join([row_placeholders] * len(self.insert_rows))
+            return f"INSERT INTO {self.table_name} ({columns}) VALUES {values}{self._on_conflict()} RETURNING *"
+        
+        elif self.operation == 'delete':
+            # RETURNING * so callers can tell whether anything was deleted (as Supabase does)
+            return f"DELETE FROM {self.table_name}" + self._where() + " RETURNING *"
+        
+        raise ValueError(f"Unsupported operation: {self.operation}")
+    
+    def _bind_params(self) -> list:
+        """Parameter values, in placeholder order"""
+        if self.operation == 'select':
+            params = list(self.params)
+            if self.limit_val is not None:
+                params.append(self.limit_val)
+            if self.offset_val:
+                params.append(self.offset_val)
+            return params
+        if self.operation == 'update':
+            return [_adapt_value(value) for value in self.update_data.values()] + self.params
+        if self.operation in ('insert', 'upsert'):
+            # Missing keys are inserted as NULL; JSON values are serialized once here
+            return [_adapt_value(row.get(column)) for row in self.insert_rows for column in self.insert_columns]
+        return list(self.params)
+    
+    def _on_conflict(self) -> str:
+        if self.operation == 'upsert':
+            target = ', '.join(self.on_conflict)
+            update_columns = self.update_columns
+            if update_columns is None:
+                update_columns = [c for c in self.insert_columns if c not in self.on_conflict]
+            if self.ignore_duplicates or not update_columns:
+                return f" ON CONFLICT ({target}) DO NOTHING"
+            assignments = ', '.join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+            return f" ON CONFLICT ({target}) DO UPDATE SET {assignments}"
+        # For problem_company_tags, use ON CONFLICT DO NOTHING to handle duplicates
+        if self.operation == 'insert' and self.table_name == 'problem_company_tags':
+            return " ON CONFLICT (problem_id, tag_id) DO NOTHING"
+        return ""
+    
+    def _use_copy(self) -> bool:
+        """Large multi-row inserts are loaded with COPY instead of a VALUES list (upserts never are)"""
+        return self.operation == 'insert' and len(self.insert_rows) >= settings.DB_COPY_THRESHOLD
+    
+    def _copy_statements(self):
+        """
+        SQL for the COPY path: rows are copied into a typed staging table, then moved
+        with INSERT ... SELECT so ON CONFLICT and RETURNING behave like a normal insert.
+        Returns (create_staging_sql, staging_table, copy_sql, insert_sql).
+        """
+        columns = ', '.join(self.insert_columns)
+        # Unique per statement: two bulk inserts into one table can share a transaction
+        staging = f"_copy_{self.table_name}_{uuid.uuid4().hex[:8]}"
+        create = (f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                  f"SELECT {columns} FROM {self.table_name} WITH NO DATA")
+        copy = f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        insert = (f"INSERT INTO {self.table_name} ({columns}) SELECT {columns} FROM {staging}"
+                  f"{self._on_conflict()} RETURNING *")
+        return create, staging, copy, insert
+    
+    def _copy_data(self) -> str:
+        """CSV payload for COPY - JSON values are serialized once per batch"""
+        columns = self.insert_columns
+        return ''.join(
+            ','.join(_csv_field(row.get(column)) for column in columns) + '\n'
+            for row in self.insert_rows
+        )
+    
+    def compile(self):
+        """
+        Return the CompiledStatement and the parameters to run it with. Statements are
+        cached by shape, except multi-row inserts: their SQL differs with every row count,
+        so caching them would only evict the hot shapes.
+        """
+        if self.operation in ('insert', 'upsert') and not self.insert_rows:
+            raise ValueError("Insert data is required")
+        if len(self.insert_rows) > 1:
+            return CompiledStatement(self._build_sql()), self._bind_params()
+        statement = _statement_cache.get(self._shape(), self._build_sql)
+        return statement, self._bind_params()
+    
+    @contextmanager
+    def _connection(self):
+        """The session's connection when bound to one, otherwise a pooled connection for this statement"""
+        if self.session is not None:
+            yield self.session.connection()
+        else:
+            with get_db_connection() as conn:
+                yield conn
+    
+    def _in_transaction(self) -> bool:
+        return self.session is not None and self.session.in_transaction
+    
+    def _execute_copy(self):
+        """Bulk insert through COPY FROM STDIN in a single transaction"""
+        if self.session is not None and not self.session.in_transaction:
+            # The staging table lives until commit, so COPY always needs a transaction
+            with self.session.transaction():
+                return self._execute_copy()
+        create, _, copy, insert = self._copy_statements()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(create)
+            cursor.copy_expert(copy, io.StringIO(self._copy_data()))
+            cursor.execute(insert)
+            if not self._in_transaction():
                 conn.commit()
-                result = cursor.fetchone()
-                cursor.close()
-                # ON CONFLICT DO NOTHING may return no row, which is fine
-                return Response([dict(result)] if result else [])
-            
-            elif self.operation == 'delete':
-                query = f"DELETE FROM {self.table_name}"
-                if self.conditions:
-                    where_clause = ' AND '.join(self.conditions)
-                    # Replace $1, $2, $3... with %s (but not other $ characters)
-                    import re
-                    where_clause = re.sub(r'\$\d+', '%s', where_clause)
-                    query += f" WHERE {where_clause}"
-                    cursor.execute(query, self.params)
-                else:
-                    cursor.execute(query)
+            response = _cursor_response(cursor)
+            cursor.close()
+            return response
+    
+    def _check_streamable(self):
+        if self.operation != 'select':
+            raise ValueError("stream() is only supported for select queries")
+    
+    def stream(self, batch_size: int = 1000):
+        """
+        Run a select through a named server-side cursor and yield rows in lists of
+        up to batch_size, so memory stays flat regardless of table size.
+        On a session the cursor uses the session's connection, inside its transaction (one
+        is opened for the stream if needed, so other statements on the session join it
+        until the generator is exhausted or closed); otherwise a pooled connection is held.
+        """
+        self._check_streamable()
+        statement, params = self.compile()
+        if self.session is not None:
+            with self.session.transaction():
+                yield from self._fetch_batches(self.session.connection(), statement, params, batch_size)
+            return
+        with get_db_connection() as conn:
+            try:
+                yield from self._fetch_batches(conn, statement, params, batch_size)
+            finally:
+                conn.rollback()
+    
+    @staticmethod
+    def _fetch_batches(conn, statement, params, batch_size: int):
+        cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(statement.sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
+    
+    def execute(self):
+        """Execute the query"""
+        if self._use_copy():
+            return self._execute_copy()
+        statement, params = self.compile()
+        in_transaction = self._in_transaction()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Multi-row inserts are one-off shapes, not worth preparing per connection
+            _execute_statement(conn, cursor, statement, params,
+                               prepare=statement.name is not None, in_transaction=in_transaction)
+            # Inside a transaction the session commits once at the end
+            if self.operation != 'select' and not in_transaction:
                 conn.commit()
-                cursor.close()
-                return Response([])
+            # ON CONFLICT DO NOTHING may return no row, which is fine
+            response = _cursor_response(cursor)
+            cursor.close()
+            return response
+
+class CompiledStatement:
+    """SQL for one query shape, in both placeholder styles, plus its prepared statement name (None if never prepared)"""
+    
+    __slots__ = ('sql', 'dollar_sql', 'name', 'execute_sql')
+    
+    def __init__(self, sql: str, name: str = None):
+        self.sql = sql
+        parts = sql.split('%s')
+        # asyncpg / PREPARE use $1, $2, ... instead of %s
+        self.dollar_sql = parts[0] + ''.join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+        self.name = name
+        placeholders = ', '.join(['%s'] * (len(parts) - 1))
+        self.execute_sql = None
+        if name is not None:
+            self.execute_sql = f"EXECUTE {name} ({placeholders})" if placeholders else f"EXECUTE {name}"
+
+class StatementCache:
+    """Thread-safe LRU of CompiledStatement keyed by query shape, with hit/miss counters"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.prepares = 0
+        self.prepared_executions = 0
+    
+    def get(self, key, build) -> CompiledStatement:
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is not None:
+                self._statements.move_to_end(key)
+                self.hits += 1
+                return statement
+            self.misses += 1
+            self._next_id += 1
+            statement = CompiledStatement(build(), f"dsa_stmt_{self._next_id}")
+            self._statements[key] = statement
+            if len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+            return statement
+    
+    def stats(self) -> dict:
+        return {
+            "size": len(self._statements),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "prepares": self.prepares,
+            "prepared_executions": self.prepared_executions,
+        }
+
+_statement_cache = StatementCache(settings.DB_STATEMENT_CACHE_SIZE)
+
+def get_statement_cache_stats() -> dict:
+    """Hit/miss counters for the compiled statement cache"""
+    return _statement_cache.stats()
+
+def _execute_statement(conn, cursor, statement: CompiledStatement, params, prepare: bool = True,
+                       in_transaction: bool = False):
+    """
+    Run a compiled statement. With DB_PREPARED_STATEMENTS, the statement is PREPAREd
+    once per connection and then EXECUTEd, so Postgres skips parsing and planning.
+    A connection keeps at most DB_STATEMENT_CACHE_SIZE statements: beyond that the least
+    recently used one is DEALLOCATEd (statements evicted from the cache are never used
+    again, so they are the first to go).
+    """
+    prepared = getattr(conn, 'prepared', None)
+    if not (prepare and settings.DB_PREPARED_STATEMENTS) or prepared is None:
+        cursor.execute(statement.sql, params)
+        return
+    
+    if conn.stale_statements:
+        cursor.execute("DEALLOCATE ALL")
+        prepared.clear()
+        conn.stale_statements = False
+    
+    try:
+        if statement.name in prepared:
+            prepared.move_to_end(statement.name)
+        else:
+            while prepared and len(prepared) >= _statement_cache.max_size:
+                cursor.execute(f"DEALLOCATE {prepared.popitem(last=False)[0]}")
+            cursor.execute(f"PREPARE {statement.name} AS {statement.dollar_sql}")
+            prepared[statement.name] = None
+            _statement_cache.prepares += 1
+        cursor.execute(statement.execute_sql, params)
+        _statement_cache.prepared_executions += 1
+    except (errors.InvalidSqlStatementName, errors.FeatureNotSupported):
+        # Statement missing or invalidated by a schema change ("cached plan must not
+        # change result type") - drop this connection's statements and run it plainly.
+        # A caller's transaction can't be retried here, so only flag the cleanup.
+        if in_transaction:
+            conn.stale_statements = True
+            raise
+        conn.rollback()
+        cursor.execute("DEALLOCATE ALL")
+        prepared.clear()
+        cursor.execute(statement.sql, params)
+
+def _adapt_value(value):
+    """Serialize list/dict values for JSONB columns"""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def _csv_field(value) -> str:
+    """Format one value for COPY ... (FORMAT csv): unquoted empty is NULL, everything else is quoted"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    text = str(_adapt_value(value))
+    return '"' + text.replace('"', '""') + '"'
 
 class Response:
-    """Response object that mimics Supabase response"""
-    def __init__(self, data):
-        self.data = data
+    """
+    Response object that mimics Supabase response.
+    Rows are kept as tuples with the column names stored once; the list of dicts
+    in .data is only built when something asks for it.
+    """
+    __slots__ = ('columns', 'rows', '_data')
+    
+    def __init__(self, data=None, columns=(), rows=()):
+        self.columns = tuple(columns)
+        self.rows = rows
+        self._data = data
+    
+    @property
+    def data(self):
+        if self._data is None:
+            columns = self.columns
+            self._data = [dict(zip(columns, row)) for row in self.rows]
+        return self._data
+    
+    def __len__(self):
+        return len(self._data) if self._data is not None else len(self.rows)
+    
+    def column(self, name: str) -> list:
+        """Values of a single column, without building row dicts"""
+        if self._data is not None:
+            return [row[name] for row in self._data]
+        if not self.rows:
+            # asyncpg reports no column names for an empty result
+            return []
+        index = self.columns.index(name)
+        return [row[index] for row in self.rows]
+
+def _cursor_response(cursor) -> Response:
+    """Wrap a cursor's remaining rows without copying them into dicts"""
+    if cursor.description is None:
+        return Response(rows=[])
+    return Response(columns=[column.name for column in cursor.description], rows=cursor.fetchall())
 
 # Global RDS client instance
 _rds_client = None
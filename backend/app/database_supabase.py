@@ -0,0 +1,344 @@
+"""
+Supabase (PostgREST) client with the query builder interface
+
+Without RDS_HOST the API reaches the database through Supabase's REST API. PostgREST
+filters, orders, pages and writes like the RDS client, but has no joins, GROUP BY,
+aggregates, row locks or SQL select expressions. SupabaseQuery takes the same calls as
+QueryBuilder and sends what PostgREST can do; joins, grouping and the count / max /
+array_agg aggregates are computed here over the matching rows, which are read page by
+page (PostgREST caps each response at max-rows).
+
+What can't be emulated over REST: every statement commits on its own (transaction() is a
+no-op, as before) and for_update() doesn't lock, so concurrent progress writes for one
+user aren't serialized - reconcile_progress_counters.py repairs any drift. Select
+expressions (SQL text) aren't supported; callers check using_supabase() (see app.catalog).
+"""
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+# PostgREST's default max-rows: larger reads are fetched in pages of this size
+PAGE_SIZE = 1000
+
+# PostgREST sends dates and timestamps as ISO strings; the RDS clients return date/datetime
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}:\d{2})?")
+
+def _from_json(value):
+    if isinstance(value, str):
+        if _DATE.fullmatch(value):
+            return date.fromisoformat(value)
+        if _TIMESTAMP.fullmatch(value):
+            return datetime.fromisoformat(value)
+    return value
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+def _rows(data) -> list:
+    return [{key: _from_json(value) for key, value in row.items()} for row in data or []]
+
+def _sort_key(value):
+    # NULLs last, as PostgreSQL sorts them ascending
+    return (value is None, value)
+
+class Response:
+    """Rows as a list of dicts, like the RDS clients' responses"""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+class SupabaseClient:
+    """Supabase client that mimics the RDS client interface"""
+
+    def __init__(self, client, table_name: str = ''):
+        self.client = client
+        self.table_name = table_name
+
+    def table(self, table_name: str):
+        return SupabaseClient(self.client, table_name)
+
+    def select(self, *columns):
+        return SupabaseQuery(self.client, self.table_name, 'select', columns=columns)
+
+    def insert(self, data):
+        return SupabaseQuery(self.client, self.table_name, 'insert', data=data)
+
+    def upsert(self, data, on_conflict, update_columns=None, ignore_duplicates: bool = False):
+        """
+        on_conflict is a list of columns or a comma-separated string. PostgREST updates
+        every sent column outside the conflict target, so update_columns must be left unset.
+        """
+        if update_columns is not None:
+            raise ValueError("update_columns is not supported on Supabase")
+        query = SupabaseQuery(self.client, self.table_name, 'upsert', data=data)
+        query.on_conflict = on_conflict if isinstance(on_conflict, str) else ','.join(on_conflict)
+        query.ignore_duplicates = ignore_duplicates
+        return query
+
+    def update(self, data):
+        return SupabaseQuery(self.client, self.table_name, 'update', data=data)
+
+    def delete(self):
+        return SupabaseQuery(self.client, self.table_name, 'delete')
+
+class SupabaseQuery:
+    """QueryBuilder's interface over a PostgREST request builder"""
+
+    def __init__(self, client, table_name: str, operation: str, columns=(), data=None):
+        self.client = client
+        self.table_name = table_name
+        self.operation = operation
+        self.columns = list(columns) or ['*']
+        self.data = data
+        self.on_conflict = ''
+        self.ignore_duplicates = False
+        # (method, column, value, negated), applied in order
+        self.filters = []
+        self.order_by = None
+        self.limit_val = None
+        self.offset_val = 0
+        # (table, column, foreign_column)
+        self.joins = []
+        # (function, column, alias)
+        self.aggregates = []
+        self.group_by_columns = []
+        self._negate_next = False
+
+    def _filter(self, method: str, column: str, value):
+        self.filters.append((method, column, value, self._negate_next))
+        self._negate_next = False
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter('eq', column, value)
+
+    def neq(self, column: str, value):
+        return self._filter('neq', column, value)
+
+    def gt(self, column: str, value):
+        return self._filter('gt', column, value)
+
+    def gte(self, column: str, value):
+        return self._filter('gte', column, value)
+
+    def lt(self, column: str, value):
+        return self._filter('lt', column, value)
+
+    def lte(self, column: str, value):
+        return self._filter('lte', column, value)
+
+    def is_(self, column: str, value):
+        return self._filter('is_', column, value)
+
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def in_(self, column: str, values: list):
+        return self._filter('in_', column, list(values))
+
+    def limit(self, count: int):
+        self.limit_val = count
+        return self
+
+    def after(self, column: str, value):
+        """Keyset pagination, as QueryBuilder.after()"""
+        if value is not None:
+            self.gt(column, value)
+        return self.order(column)
+
+    def range(self, start: int, end: int):
+        self.limit_val = end - start + 1
+        self.offset_val = start
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by = (column, desc)
+        return self
+
+    def join(self, table: str, column: str, foreign_column: str = "id"):
+        """Inner join, computed here: rows where <this table>.column = table.foreign_column"""
+        self.joins.append((table, column, foreign_column))
+        return self
+
+    def count(self, column: str = "*", alias: str = "count"):
+        return self._aggregate("count", column, alias)
+
+    def max(self, column: str, alias: str = "max"):
+        return self._aggregate("max", column, alias)
+
+    def array_agg(self, column: str, alias: str = "array_agg"):
+        return self._aggregate("array_agg", column, alias)
+
+    def _aggregate(self, function: str, column: str, alias: str):
+        if self.columns == ['*']:
+            self.columns = []
+        self.aggregates.append((function, column, alias))
+        return self
+
+    def group_by(self, *columns):
+        self.group_by_columns.extend(columns)
+        return self
+
+    def for_update(self):
+        """No-op: PostgREST has no row locks (see the module docstring)"""
+        return self
+
+    # Column references: "table.column", or a bare column of this table
+
+    def _table_of(self, reference: str) -> str:
+        table, _, column = reference.rpartition('.')
+        return table or self.table_name
+
+    def _key(self, reference: str) -> str:
+        """reference as a key of a joined row"""
+        return reference if '.' in reference else f"{self.table_name}.{reference}"
+
+    @staticmethod
+    def _name(reference: str) -> str:
+        """Output name of a selected column, as PostgreSQL names it"""
+        return reference.rpartition('.')[2]
+
+    def _check_columns(self, columns):
+        for column in columns:
+            if column != '*' and not re.fullmatch(r"[\w.]+", column):
+                raise ValueError(f"Select expressions are not supported on Supabase: {column}")
+
+    # Requests
+
+    def _request(self, table: str, columns, filters):
+        request = self.client.table(table).select(','.join(columns))
+        for method, column, value, negated in filters:
+            builder = request.not_ if negated else request
+            request = getattr(builder, method)(self._name(column), _to_json(value))
+        return request
+
+    def _fetch(self, table: str, columns, filters, order_by=None, limit=None, offset: int = 0) -> list:
+        """Matching rows, page by page until limit (or every row)"""
+        rows = []
+        while limit is None or len(rows) < limit:
+            size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(rows))
+            request = self._request(table, columns, filters)
+            if order_by is not None:
+                request = request.order(self._name(order_by[0]), desc=order_by[1])
+            start = offset + len(rows)
+            page = _rows(request.range(start, start + size - 1).execute().data)
+            rows.extend(page)
+            if len(page) < size:
+                break
+        return rows
+
+    def _plain(self) -> bool:
+        return not (self.joins or self.aggregates or self.group_by_columns)
+
+    def _select(self) -> list:
+        self._check_columns(self.columns)
+        if self._plain():
+            return self._fetch(self.table_name, self.columns, self.filters, self.order_by, self.limit_val, self.offset_val)
+        return self._select_computed()
+
+    def _select_computed(self) -> list:
+        """Joins, grouping and aggregates over the rows PostgREST returns"""
+        references = [c for c in self.columns] + self.group_by_columns + [c for _, c, _ in self.aggregates if c != '*']
+        if self.order_by is not None and self.order_by[0] not in {alias for _, _, alias in self.aggregates}:
+            references.append(self.order_by[0])
+        tables = [self.table_name] + [table for table, _, _ in self.joins]
+        needed = {table: set() for table in tables}
+        for reference in references:
+            needed[self._table_of(reference)].add(self._name(reference))
+        for table, column, foreign_column in self.joins:
+            needed[self.table_name].add(column)
+            needed[table].add(foreign_column)
+
+        def fetch(table):
+            filters = [f for f in self.filters if self._table_of(f[1]) == table]
+            columns = sorted(needed[table]) or ['*']
+            return [{f"{table}.{k}": v for k, v in row.items()} for row in self._fetch(table, columns, filters)]
+
+        rows = fetch(self.table_name)
+        for table, column, foreign_column in self.joins:
+            matches = {}
+            for row in fetch(table):
+                matches.setdefault(row[f"{table}.{foreign_column}"], []).append(row)
+            left = f"{self.table_name}.{column}"
+            rows = [dict(row, **match) for row in rows for match in matches.get(row[left], ())]
+
+        if self.aggregates or self.group_by_columns:
+            rows = self._group(rows)
+        else:
+            rows = [{self._name(c): row[self._key(c)] for c in self.columns} for row in rows]
+        if self.order_by is not None:
+            column, desc = self.order_by
+            rows.sort(key=lambda row: _sort_key(row[self._name(column)]), reverse=desc)
+        end = None if self.limit_val is None else self.offset_val + self.limit_val
+        return rows[self.offset_val:end]
+
+    def _group(self, rows) -> list:
+        keys = [self._key(column) for column in self.group_by_columns]
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row[key] for key in keys), []).append(row)
+        if not keys and not groups:
+            # Aggregates without GROUP BY always return one row
+            groups[()] = []
+        result = []
+        for group_key, group in groups.items():
+            values = dict(zip(keys, group_key))
+            out = {self._name(column): values[self._key(column)] for column in self.columns if self._key(column) in values}
+            for function, column, alias in self.aggregates:
+                items = [row[self._key(column)] for row in group] if column != '*' else group
+                present = [item for item in items if item is not None]
+                if function == 'count':
+                    out[alias] = len(present)
+                elif function == 'max':
+                    out[alias] = max(present, default=None)
+                else:
+                    out[alias] = sorted(items, key=_sort_key) if items else None
+            result.append(out)
+        return result
+
+    def _write(self) -> list:
+        table = self.client.table(self.table_name)
+        if self.operation in ('insert', 'upsert'):
+            rows = self.data if isinstance(self.data, list) else [self.data]
+            if not rows:
+                raise ValueError("Insert data is required")
+            payload = [{k: _to_json(v) for k, v in row.items()} for row in rows]
+            if self.operation == 'insert':
+                request = table.insert(payload)
+            else:
+                request = table.upsert(payload, on_conflict=self.on_conflict, ignore_duplicates=self.ignore_duplicates)
+        else:
+            if self.operation == 'update':
+                request = table.update({k: _to_json(v) for k, v in self.data.items()})
+            else:
+                request = table.delete()
+            for method, column, value, negated in self.filters:
+                builder = request.not_ if negated else request
+                request = getattr(builder, method)(self._name(column), _to_json(value))
+        return _rows(request.execute().data)
+
+    def stream(self, batch_size: int = 1000):
+        """Rows in lists of up to batch_size, one request per list"""
+        if self.operation != 'select' or not self._plain():
+            raise ValueError("stream() is only supported for plain select queries")
+        self._check_columns(self.columns)
+        offset = self.offset_val
+        while True:
+            rows = self._fetch(self.table_name, self.columns, self.filters, self.order_by, batch_size, offset)
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+            offset += len(rows)
+
+    def execute(self):
+        if self.operation == 'select':
+            return Response(self._select())
+        return Response(self._write())
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import problems, user_progress, auth, company_tags
+from app.routers import problems, user_progress, auth, company_tags, bootstrap
 from app.config import settings
 
 app = FastAPI(title="DSA Patterns API", version="1.0.0")
@@ -13,6 +13,7 @@ if settings.CORS_ORIGIN_REGEX:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count"],
     )
 else:
     app.add_middleware(
@@ -21,14 +22,22 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count"],
     )
 
 # Include routers
 app.include_router(problems.router, prefix="/api/problems", tags=["problems"])
 app.include_router(user_progress.router, prefix="/api/user", tags=["user"])
+app.include_router(bootstrap.router, prefix="/api/user", tags=["user"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(company_tags.router, prefix="/api/company-tags", tags=["company-tags"])
 
+@app.on_event("shutdown")
+async def close_database_pools():
+    if settings.DB_ENGINE == "async":
+        from app.database_async import close_async_pool
+        await close_async_pool()
+
 @app.get("/")
 async def root():
     return {"message": "DSA Patterns API", "version": "1.0.0"}
@@ -50,12 +59,20 @@ async def debug_database():
     try:
         client = get_supabase()
         db_type = "RDS" if rds_host else "Supabase"
-        return {
+        info = {
             "RDS_HOST": "SET" if rds_host else "NOT SET",
             "SUPABASE_URL": "SET" if supabase_url else "NOT SET",
             "Database_Type": db_type,
             "Client_Type": type(client).__name__
         }
+        if rds_host:
+            from app.database_rds import get_statement_cache_stats, get_pool_stats
+            info["Statement_Cache"] = get_statement_cache_stats()
+            info["Pool"] = get_pool_stats()
+            if settings.DB_ENGINE == "async":
+                from app.database_async import get_async_pool_stats
+                info["Async_Pool"] = get_async_pool_stats()
+        return info
     except Exception as e:
         return {
             "error": str(e),
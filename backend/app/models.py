@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Literal, Optional, List
 from datetime import date
+import json
 
 class Problem(BaseModel):
     id: int
@@ -11,6 +12,16 @@ class Problem(BaseModel):
     link: str
     subtopic: Optional[str] = None
     solution_text: Optional[str] = None
+    # Lists leave solution_text out (see GET /api/problems/{id}/solution); this says whether there is one
+    has_solution: bool = False
+
+    @field_validator("topics", mode="before")
+    @classmethod
+    def parse_topics(cls, value):
+        # Older Supabase rows stored topics as a JSON-encoded string
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
 
 class UserProgress(BaseModel):
     problem_id: int
@@ -28,11 +39,27 @@ class ProgressStats(BaseModel):
     medium_total: int
     hard_solved: int
     hard_total: int
+    revision_count: int = 0
+    last_solved_at: Optional[date] = None
+
+class ProgressOperation(BaseModel):
+    action: Literal["solve", "unsolve", "add_revision", "remove_revision"]
+    problem_id: int
+    # User's local date for "solve"; defaults to the server's date
+    solved_at: Optional[date] = None
+
+class ProgressBatchRequest(BaseModel):
+    operations: List[ProgressOperation] = Field(max_length=2000)
 
 class CalendarData(BaseModel):
     date: str
     problem_count: int
 
+class CalendarResponse(BaseModel):
+    days: List[CalendarData]
+    current_streak: int
+    longest_streak: int
+
 class ProblemCreate(BaseModel):
     number: int
     title: str
@@ -64,3 +91,18 @@ class CompanyTagUpdate(BaseModel):
 class MarkSolvedRequest(BaseModel):
     solved_at: Optional[str] = None
 
+# Initial page load
+class ProblemChanges(BaseModel):
+    version: Optional[str] = None
+    upserted: List[Problem]
+    deleted: List[int]
+
+class Bootstrap(BaseModel):
+    format_version: int
+    problems: ProblemChanges
+    solved: List[int]
+    revision: List[int]
+    stats: ProgressStats
+    calendar: CalendarResponse
+    company_tags: List[CompanyTag]
+    problem_tags: Dict[int, List[int]]
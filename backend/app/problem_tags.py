@@ -0,0 +1,83 @@
+"""
+In-process problem -> company tag map
+
+The main page loads the company tags of every problem at once. The map is read with one
+query - problem_company_tags aggregated to a row per tagged problem - and kept in memory,
+with its response bodies rendered once per format. Tag writes through this process
+invalidate it; writes from other instances are picked up by a version probe at most
+every CATALOG_PROBE_INTERVAL seconds. The version is (max(id), count(*)): ids are never
+reused, so any insert raises the max and deletes alone lower the count.
+"""
+import time
+
+from app.config import settings
+from app.responses import JSON, EncodedPayload, encode
+
+class ProblemTagMap:
+    """problem_id -> [tag_id] (sorted, tagged problems only), plus tag_id -> [problem_id]. Never mutated."""
+
+    __slots__ = ('version', 'tags', 'by_tag', '_payloads')
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.tags = {row['problem_id']: list(row['tag_ids']) for row in rows}
+        by_tag = {}
+        for problem_id, tag_ids in self.tags.items():
+            for tag_id in tag_ids:
+                by_tag.setdefault(tag_id, []).append(problem_id)
+        self.by_tag = by_tag
+        self._payloads = {}
+
+    def payload(self, media_type: str = JSON) -> EncodedPayload:
+        """The map in media_type, as an EncodedPayload"""
+        payload = self._payloads.get(media_type)
+        if payload is None:
+            payload = self._payloads[media_type] = EncodedPayload(
+                encode(self.tags, media_type), media_type, vary="Accept, Accept-Encoding"
+            )
+        return payload
+
+    def problem_ids(self, tag_ids) -> set:
+        """Problems with any of tag_ids"""
+        return {problem_id for tag_id in tag_ids for problem_id in self.by_tag.get(tag_id, ())}
+
+    def tag_counts(self) -> dict:
+        """tag_id -> number of problems with the tag"""
+        return {tag_id: len(problem_ids) for tag_id, problem_ids in self.by_tag.items()}
+
+_map = None
+_checked_at = 0.0
+# Bumped by invalidate(), so a load that overlaps a write doesn't store what it read before it
+_generation = 0
+
+async def _probe(db):
+    """Current map version - one aggregate row"""
+    response = await db.table("problem_company_tags").select().max("id").count().execute()
+    row = response.data[0]
+    return (row['max'], row['count'])
+
+async def get_problem_tag_map(db) -> ProblemTagMap:
+    """The current map, reloaded first if it was invalidated or the version probe shows the table changed"""
+    global _map, _checked_at
+    tag_map = _map
+    if tag_map is not None and time.monotonic() - _checked_at < settings.CATALOG_PROBE_INTERVAL:
+        return tag_map
+    generation = _generation
+    version = await _probe(db)
+    if tag_map is not None and tag_map.version == version:
+        _checked_at = time.monotonic()
+        return tag_map
+    response = await (
+        db.table("problem_company_tags").select("problem_id").array_agg("tag_id", "tag_ids")
+        .group_by("problem_id").execute()
+    )
+    tag_map = ProblemTagMap(version, response.data)
+    if generation == _generation:
+        _map, _checked_at = tag_map, time.monotonic()
+    return tag_map
+
+def invalidate():
+    """Drop the map after a tag write through this process; the next read reloads it"""
+    global _map, _generation
+    _map = None
+    _generation += 1
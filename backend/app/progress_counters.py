@@ -0,0 +1,176 @@
+"""
+Per-user progress counters
+
+user_progress_counters keeps each user's solved count per difficulty, revision count and
+last solved date, so stats are one primary-key lookup instead of a scan of the user's
+progress joined to the problems table. Every progress write goes through
+update_progress(), which applies the change to the counters in the same transaction;
+the counters row is locked first, so concurrent writes for one user are serialized.
+reconcile() recomputes given users' counters from user_progress under the same lock - for
+drift, and after changes that bypass the progress endpoints (deleting a problem cascades
+to progress rows, changing a problem's difficulty moves its solves).
+"""
+from datetime import datetime, timezone
+
+from app.catalog import get_catalog
+
+COUNTERS_TABLE = "user_progress_counters"
+DIFFICULTY_COLUMNS = {"Easy": "easy_solved", "Medium": "medium_solved", "Hard": "hard_solved"}
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _empty(user_id: str) -> dict:
+    return {
+        "user_id": user_id, "easy_solved": 0, "medium_solved": 0, "hard_solved": 0,
+        "revision_count": 0, "last_solved_at": None,
+    }
+
+async def _compute(db, user_ids) -> dict:
+    """Counters from user_progress as {user_id: row}, for each of user_ids"""
+    solved = await (
+        db.table("user_progress").select("user_progress.user_id", "problems.difficulty").count()
+        .join("problems", "problem_id").eq("user_progress.solved", True)
+        .in_("user_progress.user_id", user_ids).group_by("user_progress.user_id", "problems.difficulty").execute()
+    )
+    revision = await (
+        db.table("user_progress").select("user_id").count().eq("in_revision", True)
+        .in_("user_id", user_ids).group_by("user_id").execute()
+    )
+    last_solved = await (
+        db.table("user_progress").select("user_id").max("solved_at").eq("solved", True)
+        .in_("user_id", user_ids).group_by("user_id").execute()
+    )
+
+    counters = {user_id: _empty(user_id) for user_id in user_ids}
+    for row in solved.data:
+        column = DIFFICULTY_COLUMNS.get(row["difficulty"])
+        if column:
+            counters[row["user_id"]][column] = row["count"]
+    for row in revision.data:
+        counters[row["user_id"]]["revision_count"] = row["count"]
+    for row in last_solved.data:
+        counters[row["user_id"]]["last_solved_at"] = row["max"]
+    return counters
+
+async def reconcile(db, user_ids) -> int:
+    """
+    Recompute the counters of user_ids from user_progress. Their counter rows are locked
+    before counting, as update_progress() does, so no progress write can land between the
+    count and the write-back. Rows that don't exist yet are only inserted: a concurrent
+    first write creates and fills its own. Returns the number of counter rows written.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return 0
+    async with db.transaction():
+        locked = await (
+            db.table(COUNTERS_TABLE).select("user_id").in_("user_id", user_ids)
+            .order("user_id").for_update().execute()
+        )
+        existing = {row["user_id"] for row in locked.data}
+        counters = await _compute(db, user_ids)
+        now = _now()
+        updates = [dict(counters[user_id], updated_at=now) for user_id in user_ids if user_id in existing]
+        inserts = [dict(counters[user_id], updated_at=now) for user_id in user_ids if user_id not in existing]
+        if updates:
+            await db.table(COUNTERS_TABLE).upsert(updates, on_conflict="user_id").execute()
+        if inserts:
+            await db.table(COUNTERS_TABLE).upsert(inserts, on_conflict="user_id", ignore_duplicates=True).execute()
+    return len(user_ids)
+
+async def get_counters(db, user_id: str) -> dict:
+    """The user's counters; computed and stored on first use"""
+    response = await db.table(COUNTERS_TABLE).select("*").eq("user_id", user_id).execute()
+    if response.data:
+        return response.data[0]
+    counters = (await _compute(db, [user_id]))[user_id]
+    # Insert only: a progress write that created the row meanwhile has the newer counts
+    await db.table(COUNTERS_TABLE).upsert(
+        dict(counters, updated_at=_now()), on_conflict="user_id", ignore_duplicates=True
+    ).execute()
+    return counters
+
+async def _lock(db, user_id: str) -> dict:
+    """The user's counters row, locked until the transaction ends (created from user_progress if missing)"""
+    created = await db.table(COUNTERS_TABLE).upsert(
+        dict(_empty(user_id), updated_at=_now()), on_conflict="user_id", ignore_duplicates=True
+    ).execute()
+    if created.data:
+        # New row: fill it from whatever progress the user already has
+        await reconcile(db, [user_id])
+    response = await db.table(COUNTERS_TABLE).select("*").eq("user_id", user_id).for_update().execute()
+    return response.data[0]
+
+async def _difficulties(db, problem_ids) -> dict:
+    """{problem_id: difficulty}, from the catalog (the database for problems it doesn't have yet)"""
+    catalog = await get_catalog(db)
+    difficulties = {}
+    for problem_id in problem_ids:
+        problem = catalog.get(problem_id)
+        if problem is not None:
+            difficulties[problem_id] = problem["difficulty"]
+    missing = [problem_id for problem_id in problem_ids if problem_id not in difficulties]
+    if missing:
+        response = await db.table("problems").select("id", "difficulty").in_("id", missing).execute()
+        difficulties.update({row["id"]: row["difficulty"] for row in response.data})
+    return difficulties
+
+async def update_progress(db, user_id: str, problem_ids, *queries) -> dict:
+    """
+    Execute queries - user_progress writes for (user_id, problem_ids), returning the written
+    rows - in order, and apply the changes to the user's counters, in one transaction.
+    Returns the user's counters after the change.
+    """
+    problem_ids = list(dict.fromkeys(problem_ids))
+    async with db.transaction():
+        counters = await _lock(db, user_id)
+        before_resp = await (
+            db.table("user_progress").select("problem_id", "solved", "solved_at", "in_revision")
+            .eq("user_id", user_id).in_("problem_id", problem_ids).execute()
+        )
+        empty = {"solved": False, "solved_at": None, "in_revision": False}
+        before = {problem_id: empty for problem_id in problem_ids}
+        before.update({row["problem_id"]: row for row in before_resp.data})
+        after = dict(before)
+        for query in queries:
+            response = await query.execute()
+            after.update({row["problem_id"]: row for row in response.data})
+
+        changes = {}
+        solved_deltas = {
+            problem_id: bool(after[problem_id]["solved"]) - bool(before[problem_id]["solved"])
+            for problem_id in problem_ids
+        }
+        changed = [problem_id for problem_id, delta in solved_deltas.items() if delta]
+        for problem_id, difficulty in (await _difficulties(db, changed)).items() if changed else ():
+            column = DIFFICULTY_COLUMNS.get(difficulty)
+            if column:
+                changes[column] = changes.get(column, counters[column]) + solved_deltas[problem_id]
+        revision_delta = sum(
+            bool(after[problem_id]["in_revision"]) - bool(before[problem_id]["in_revision"])
+            for problem_id in problem_ids
+        )
+        if revision_delta:
+            changes["revision_count"] = counters["revision_count"] + revision_delta
+
+        last_solved_at = counters["last_solved_at"]
+        solved_at = [after[p]["solved_at"] for p in problem_ids if after[p]["solved"] and after[p]["solved_at"] is not None]
+        latest_undone = last_solved_at is not None and any(
+            before[p]["solved"] and before[p]["solved_at"] == last_solved_at
+            and (not after[p]["solved"] or after[p]["solved_at"] != last_solved_at)
+            for p in problem_ids
+        )
+        if latest_undone:
+            # The latest solve was undone or moved earlier - look up the new latest
+            latest = await (
+                db.table("user_progress").select().max("solved_at")
+                .eq("user_id", user_id).eq("solved", True).execute()
+            )
+            changes["last_solved_at"] = latest.data[0]["max"]
+        elif solved_at and (last_solved_at is None or max(solved_at) > last_solved_at):
+            changes["last_solved_at"] = max(solved_at)
+
+        if changes:
+            await db.table(COUNTERS_TABLE).update(dict(changes, updated_at=_now())).eq("user_id", user_id).execute()
+    return dict(counters, **changes)
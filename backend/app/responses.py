@@ -0,0 +1,217 @@
+"""
+Response encoding
+
+Rows read from our own database are trusted: they are encoded straight to JSON bytes
+instead of being validated into Pydantic models and serialized again by FastAPI's
+response_model. Routes keep response_model for the OpenAPI schema; FastAPI does not
+re-validate a returned Response. Request bodies are still validated by their models.
+
+Large bodies that only change with the data behind them (e.g. the problem list) are
+rendered and compressed once, and conditional requests get a 304. Large bodies built per
+request (the bootstrap) get the same ETag and 304, compressed at a faster level.
+
+Bulk endpoints negotiate their format from the Accept header: plain JSON (the default),
+columnar JSON - lists of rows sent as one array per field, with repeated strings
+(topics, subtopic) replaced by indexes into a dictionary - or MessagePack of that
+columnar form. Responses that aren't lists of rows (id lists, maps) are the same in both
+JSON layouts. api.js decodes every format back into the plain JSON shape.
+"""
+import gzip
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder gives the same output, slower
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; without it the columnar JSON format is offered instead
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.dsa.columnar+json"
+MSGPACK = "application/msgpack"
+
+# Fields with few distinct values, sent as dictionary indexes in the columnar format
+DICTIONARY_FIELDS = ("topics", "subtopic")
+
+def _default(value):
+    """Database types the encoders don't handle themselves"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Numeric columns and aggregates (e.g. avg) come back as Decimal
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """Compact JSON bytes; dict keys that aren't strings (e.g. ids) become strings, as in json.dumps"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+def json_response(content, status_code: int = 200, headers=None) -> Response:
+    """Encode trusted data without going through response_model"""
+    return Response(dumps(content), status_code=status_code, media_type="application/json", headers=headers)
+
+def negotiate(accept: str) -> str:
+    """
+    Format for a bulk response. The columnar formats are only used when named in Accept;
+    anything else (*/*, no header) gets plain JSON. Ties go to the most compact format.
+    """
+    accepted = _quality_values(accept)
+    json_q = max(accepted.get(JSON, 0.0), accepted.get("application/*", 0.0), accepted.get("*/*", 0.0 if accepted else 1.0))
+    candidates = [(accepted.get(COLUMNAR_JSON, 0.0), COLUMNAR_JSON), (json_q, JSON)]
+    if msgpack is not None:
+        candidates.insert(0, (accepted.get(MSGPACK, 0.0), MSGPACK))
+    q, media_type = max(candidates, key=lambda candidate: candidate[0])
+    return media_type if q > 0 else JSON
+
+def columnar(rows) -> dict:
+    """
+    Rows (dicts with the same keys) as {count, columns: {field: [values]}, dictionaries}.
+    DICTIONARY_FIELDS hold indexes into dictionaries[field] (a list of indexes for list fields);
+    None stays None.
+    """
+    fields = list(rows[0]) if rows else []
+    columns = {field: [row[field] for row in rows] for field in fields}
+    dictionaries = {}
+    for field in DICTIONARY_FIELDS:
+        if field not in columns:
+            continue
+        index = {}
+        code = lambda value: None if value is None else index.setdefault(value, len(index))
+        columns[field] = [
+            [code(item) for item in value] if isinstance(value, (list, tuple)) else code(value)
+            for value in columns[field]
+        ]
+        dictionaries[field] = list(index)
+    return {"count": len(rows), "columns": columns, "dictionaries": dictionaries}
+
+def rows_as(rows, media_type: str):
+    """A list of rows in the shape media_type sends it: as-is for JSON, columnar otherwise"""
+    return rows if media_type == JSON else columnar(rows)
+
+def encode(content, media_type: str) -> bytes:
+    """content as bytes of media_type (both columnar formats are JSON-compatible values)"""
+    if media_type == MSGPACK:
+        return msgpack.packb(content, default=_default)
+    return dumps(content)
+
+def negotiated_response(content, media_type: str, headers=None) -> Response:
+    """A bulk response in the negotiated format; rows inside content must already be rows_as()"""
+    headers = dict(headers or {}, Vary="Accept")
+    return Response(encode(content, media_type), media_type=media_type, headers=headers)
+
+@lru_cache(maxsize=None)
+def _model_fields(model) -> tuple:
+    return tuple((name, field.get_default()) for name, field in model.model_fields.items())
+
+def project(row, model) -> dict:
+    """
+    A trusted row reduced to the fields of a response model, in the model's order, with the
+    model's defaults for missing fields - the same shape response_model would produce.
+    """
+    return {name: row.get(name, default) for name, default in _model_fields(model)}
+
+def _quality_values(header: str) -> dict:
+    """Accept or Accept-Encoding header as {value: q}"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (as If-None-Match uses), ignoring the per-encoding suffix"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-")[0] == etag:
+            return True
+    return False
+
+# Compression settings for bodies rendered once and reused, and for bodies built per request
+CACHED_GZIP_LEVEL, CACHED_BROTLI_QUALITY = 9, 11
+FAST_GZIP_LEVEL, FAST_BROTLI_QUALITY = 5, 4
+
+class EncodedPayload:
+    """
+    A response body with a strong ETag and gzip/brotli variants. Cached payloads compress
+    every variant up front, at full ratio; `fast` payloads (built per request, e.g. the
+    bootstrap) compress only the variant asked for, trading ratio for speed.
+    """
+
+    __slots__ = ('etag', 'media_type', 'vary', 'fast', 'variants')
+
+    def __init__(self, body: bytes, media_type: str = "application/json", vary: str = "Accept-Encoding", fast: bool = False):
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.media_type = media_type
+        self.vary = vary
+        self.fast = fast
+        self.variants = {"identity": body}
+        if not fast:
+            for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+                self._variant(encoding)
+
+    def _encoding(self, accept_encoding: str) -> str:
+        accepted = _quality_values(accept_encoding)
+        for coding in ("br", "gzip"):
+            if (coding == "gzip" or brotli is not None) and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+                return coding
+        return "identity"
+
+    def _variant(self, encoding: str) -> bytes:
+        body = self.variants.get(encoding)
+        if body is None:
+            identity = self.variants["identity"]
+            if encoding == "br":
+                body = brotli.compress(identity, quality=FAST_BROTLI_QUALITY if self.fast else CACHED_BROTLI_QUALITY)
+            else:
+                body = gzip.compress(identity, compresslevel=FAST_GZIP_LEVEL if self.fast else CACHED_GZIP_LEVEL, mtime=0)
+            self.variants[encoding] = body
+        return body
+
+    def response(self, request_headers) -> Response:
+        """
+        304 with no body when If-None-Match matches, otherwise the best encoding the client accepts.
+        Each encoding gets its own strong ETag, as the bytes differ.
+        """
+        encoding = self._encoding(request_headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"',
+            "Vary": self.vary,
+            # Let browsers keep the body but revalidate it on every use
+            "Cache-Control": "no-cache",
+        }
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self._variant(encoding), media_type=self.media_type, headers=headers)
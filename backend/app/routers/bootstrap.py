@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from app.database import get_db
+from app.auth import get_current_username
+from app.catalog import get_catalog
+from app.models import Bootstrap
+from app.progress_counters import get_counters
+from app.responses import EncodedPayload, encode, negotiate
+from app.routers.company_tags import company_tag_list, problem_tag_map
+from app.routers.problems import catalog_changes
+from app.routers.user_progress import calendar_data, progress_stats
+from typing import Optional
+from datetime import date
+
+router = APIRouter()
+
+# Bumped when the payload's shape changes
+BOOTSTRAP_FORMAT_VERSION = 1
+
+async def _user_part(db, user_id: str, days: int, today: date) -> dict:
+    """The user's progress ids, counters and calendar"""
+    # Solved and revision ids in one pass over the user's rows
+    progress = await (
+        db.table("user_progress").select("problem_id", "solved", "in_revision")
+        .eq("user_id", user_id).execute()
+    )
+    return {
+        "solved": [row["problem_id"] for row in progress.data if row["solved"]],
+        "revision": [row["problem_id"] for row in progress.data if row["in_revision"]],
+        "counters": await get_counters(db, user_id),
+        "calendar": await calendar_data(db, user_id, days, today),
+    }
+
+async def _shared_part(db, since: Optional[str], media_type: str) -> dict:
+    """The parts every user gets: catalog, problem changes and company tags (mostly from memory)"""
+    return {
+        "catalog": await get_catalog(db),
+        "problems": await catalog_changes(db, since, media_type),
+        "company_tags": await company_tag_list(db),
+        "problem_tags": await problem_tag_map(db),
+    }
+
+@router.get("/{user_id}/bootstrap", response_model=Bootstrap)
+async def get_bootstrap(
+    user_id: str,
+    request: Request,
+    since: Optional[str] = None,
+    days: int = Query(371, ge=1, le=3660),
+    today: Optional[date] = None,
+    current_user: str = Depends(get_current_username),
+    db=Depends(get_db),
+):
+    """
+    Everything the main page needs, in one response: problem changes since the client's
+    catalog version `since` (as /api/problems/changes), solved and revision ids, stats,
+    the calendar for `days` days ending `today`, company tags and the problem -> tag map.
+    The token is decoded once and every query runs on the request's connection; the
+    problems and totals come from the in-memory catalog. Problem rows follow the negotiated format.
+    The body is compressed and carries an ETag; If-None-Match gets a 304.
+    """
+    try:
+        media_type = negotiate(request.headers.get("accept", ""))
+        user = await _user_part(db, current_user, days, today or date.today())
+        shared = await _shared_part(db, since, media_type)
+        body = encode({
+            "format_version": BOOTSTRAP_FORMAT_VERSION,
+            "problems": shared["problems"],
+            "solved": user["solved"],
+            "revision": user["revision"],
+            "stats": progress_stats(user["counters"], shared["catalog"].facets["difficulties"]),
+            "calendar": user["calendar"],
+            "company_tags": shared["company_tags"],
+            "problem_tags": shared["problem_tags"],
+        }, media_type)
+        return EncodedPayload(body, media_type, vary="Accept, Accept-Encoding", fast=True).response(request.headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,51 +1,59 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import List
-from app.database import get_supabase
+from app.database import get_db, column_values
+from app.responses import json_response, negotiate, project
 from app.models import CompanyTag, CompanyTagCreate, CompanyTagUpdate
+from app.problem_tags import get_problem_tag_map, invalidate as invalidate_problem_tags
 
 router = APIRouter()
 
+async def company_tag_list(db) -> list:
+    """Every company tag, by name"""
+    resp = await db.table("company_tags").select("*").order("name").execute()
+    return [project(row, CompanyTag) for row in resp.data]
+
+async def problem_tag_map(db) -> dict:
+    """problem_id -> list[tag_id], for tagged problems"""
+    return (await get_problem_tag_map(db)).tags
+
 @router.get("/", response_model=List[CompanyTag])
-async def list_company_tags():
+async def list_company_tags(db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        resp = supabase.table("company_tags").select("*").order("name").execute()
-        return resp.data
+        return json_response(await company_tag_list(db))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/", response_model=CompanyTag)
-async def create_company_tag(payload: CompanyTagCreate):
+async def create_company_tag(payload: CompanyTagCreate, db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        resp = supabase.table("company_tags").insert({"name": payload.name}).execute()
-        return resp.data[0]
+        resp = await db.table("company_tags").insert({"name": payload.name}).execute()
+        return json_response(project(resp.data[0], CompanyTag))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{tag_id}", response_model=CompanyTag)
-async def update_company_tag(tag_id: int, payload: CompanyTagUpdate):
+async def update_company_tag(tag_id: int, payload: CompanyTagUpdate, db=Depends(get_db)):
     try:
-        supabase = get_supabase()
         data = {k: v for k, v in payload.dict().items() if v is not None}
-        resp = supabase.table("company_tags").update(data).eq("id", tag_id).execute()
+        resp = await db.table("company_tags").update(data).eq("id", tag_id).execute()
         if not resp.data:
             raise HTTPException(status_code=404, detail="Tag not found")
-        return resp.data[0]
+        return json_response(project(resp.data[0], CompanyTag))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{tag_id}")
-async def delete_company_tag(tag_id: int):
+async def delete_company_tag(tag_id: int, db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        # delete relations first
-        supabase.table("problem_company_tags").delete().eq("tag_id", tag_id).execute()
-        resp = supabase.table("company_tags").delete().eq("id", tag_id).execute()
-        if not resp.data:
-            raise HTTPException(status_code=404, detail="Tag not found")
+        async with db.transaction():
+            # delete relations first
+            await db.table("problem_company_tags").delete().eq("tag_id", tag_id).execute()
+            resp = await db.table("company_tags").delete().eq("id", tag_id).execute()
+            if not resp.data:
+                raise HTTPException(status_code=404, detail="Tag not found")
+        invalidate_problem_tags()
         return {"message": "Tag deleted"}
     except HTTPException:
         raise
@@ -53,44 +61,42 @@ async def delete_company_tag(tag_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/problem/{problem_id}", response_model=List[int])
-async def get_problem_tags(problem_id: int):
+async def get_problem_tags(problem_id: int, db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        resp = supabase.table("problem_company_tags").select("tag_id").eq("problem_id", problem_id).execute()
-        return [row["tag_id"] for row in resp.data]
+        resp = await db.table("problem_company_tags").select("tag_id").eq("problem_id", problem_id).execute()
+        return json_response(column_values(resp, "tag_id"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/problem/{problem_id}")
-async def set_problem_tags(problem_id: int, tag_ids: List[int]):
+async def set_problem_tags(problem_id: int, tag_ids: List[int], db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        # fetch existing
-        current_resp = supabase.table("problem_company_tags").select("tag_id").eq("problem_id", problem_id).execute()
-        current = {row["tag_id"] for row in current_resp.data}
-        desired = set(tag_ids)
-        to_add = desired - current
-        to_remove = current - desired
-        if to_remove:
-            supabase.table("problem_company_tags").delete().eq("problem_id", problem_id).in_("tag_id", list(to_remove)).execute()
-        for tid in to_add:
-            supabase.table("problem_company_tags").insert({"problem_id": problem_id, "tag_id": tid}).execute()
+        async with db.transaction():
+            # fetch existing
+            current_resp = await db.table("problem_company_tags").select("tag_id").eq("problem_id", problem_id).execute()
+            current = set(column_values(current_resp, "tag_id"))
+            desired = set(tag_ids)
+            to_add = desired - current
+            to_remove = current - desired
+            if to_remove:
+                await db.table("problem_company_tags").delete().eq("problem_id", problem_id).in_("tag_id", list(to_remove)).execute()
+            if to_add:
+                await db.table("problem_company_tags").insert([{"problem_id": problem_id, "tag_id": tid} for tid in to_add]).execute()
+        if to_add or to_remove:
+            invalidate_problem_tags()
         return {"message": "Tags updated"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/all-problem-tags")
-async def get_all_problem_tags():
-    """Return mapping of problem_id -> list[tag_id]"""
+async def get_all_problem_tags(request: Request, db=Depends(get_db)):
+    """
+    Return mapping of problem_id -> list[tag_id] for every tagged problem (MessagePack if the
+    Accept header asks for it). Served from memory; ETag / If-None-Match give a 304.
+    """
     try:
-        supabase = get_supabase()
-        resp = supabase.table("problem_company_tags").select("problem_id, tag_id").execute()
-        mapping = {}
-        for row in resp.data:
-            pid = row["problem_id"]
-            tid = row["tag_id"]
-            mapping.setdefault(pid, []).append(tid)
-        return mapping
+        tag_map = await get_problem_tag_map(db)
+        return tag_map.payload(negotiate(request.headers.get("accept", ""))).response(request.headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,70 +1,270 @@
-from fastapi import APIRouter, HTTPException
-from app.database import get_supabase
+"""
+Problem routes
+
+Reads are served from the in-memory catalog (app.catalog). The full list and /changes
+without `since` are pre-rendered and compressed once per catalog version with an ETag, so
+If-None-Match gets a 304 without touching the database between catalog probes.
+solution_text is left out of lists (see /{problem_id}/solution) unless `fields` (comma-separated,
+e.g. `fields=id,title`) asks for it. Problem rows are columnar JSON or MessagePack when the
+Accept header asks for them. Paged responses send the next page's cursor in X-Next-Cursor
+(absent on the last page); search sends its total in X-Total-Count.
+
+/changes versions are updated_at timestamps (naive UTC; an offset in `since` is converted).
+A timestamp is taken when the writing transaction starts, not when it commits, so changes
+up to CATALOG_CHANGES_GRACE seconds before `since` are sent again. Clients apply `deleted`
+then `upserted` and pass the returned `version` next time.
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from app.database import get_db, column_values
+from app.auth import get_optional_username
+from app.config import settings
+from app.catalog import get_catalog, refresh_catalog, problem_row, solution_payload, suggest
+from app.problem_tags import get_problem_tag_map, invalidate as invalidate_problem_tags
+from app.progress_counters import reconcile
+from app.responses import json_response, negotiate, negotiated_response, rows_as
 from app.models import Problem, ProblemCreate, ProblemUpdate
 from typing import List, Optional
-import json
+from datetime import datetime, timedelta, timezone
+import base64
 
 router = APIRouter()
 
+def _encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_fields(fields: Optional[str]):
+    """`fields` query parameter (comma-separated Problem fields) as a tuple, or None for the default"""
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in Problem.model_fields]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields given")
+    return names
+
+async def _with_fields(db, problems, fields) -> list:
+    """
+    Catalog problems reduced to the requested fields. solution_text isn't in the catalog,
+    so it is read from the database, for these problems only, when it is asked for.
+    """
+    if fields is None:
+        return problems
+    solutions = {}
+    if "solution_text" in fields and problems:
+        response = await db.table("problems").select("id", "solution_text").in_("id", [p["id"] for p in problems]).execute()
+        solutions = {row["id"]: row["solution_text"] for row in response.data}
+    return [
+        {name: solutions.get(problem["id"]) if name == "solution_text" else problem[name] for name in fields}
+        for problem in problems
+    ]
+
 @router.get("/", response_model=List[Problem])
-async def get_all_problems():
-    """Get all problems"""
+async def get_all_problems(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = None,
+    db=Depends(get_db),
+):
+    """Get all problems, or one page of them with `limit` / `cursor`"""
     try:
-        supabase = get_supabase()
-        # Get all problems, handling pagination
-        all_problems = []
-        offset = 0
-        limit = 1000
-        while True:
-            response = supabase.table("problems").select("*").range(offset, offset + limit - 1).execute()
-            if not response.data:
-                break
-            all_problems.extend(response.data)
-            if len(response.data) < limit:
-                break
-            offset += limit
+        selected = _parse_fields(fields)
+        media_type = negotiate(request.headers.get("accept", ""))
+        catalog = await get_catalog(db)
+        if cursor is None and limit is None and selected is None:
+            return catalog.list_payload(media_type).response(request.headers)
         
-        # Parse topics from JSON string to list
-        problems = []
-        for problem in all_problems:
-            if isinstance(problem.get('topics'), str):
-                problem['topics'] = json.loads(problem['topics'])
-            problems.append(Problem(**problem))
-        return problems
+        if cursor is None and limit is None:
+            problems = await _with_fields(db, catalog.problems, selected)
+            return negotiated_response(rows_as(problems, media_type), media_type)
+        page_size = limit or 1000
+        page = catalog.page(_decode_cursor(cursor) if cursor is not None else None, page_size)
+        headers = {"X-Next-Cursor": _encode_cursor(page[-1]["id"])} if len(page) == page_size else None
+        problems = await _with_fields(db, page, selected)
+        return negotiated_response(rows_as(problems, media_type), media_type, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def catalog_changes(db, since: Optional[str], media_type: str) -> dict:
+    """{version, upserted, deleted} since a catalog version (see /changes); 400 for an invalid version"""
+    catalog = await get_catalog(db)
+    if since is None:
+        return catalog.full_changes(media_type)
+    
+    try:
+        since_ts = datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid version")
+    if since_ts.tzinfo is not None:
+        # updated_at is a naive UTC timestamp
+        since_ts = since_ts.astimezone(timezone.utc).replace(tzinfo=None)
+    # Look back a little: a writer that committed after the client's version was taken
+    # may carry an older timestamp. Changes the client already has are just sent again.
+    window = since_ts - timedelta(seconds=settings.CATALOG_CHANGES_GRACE)
+    tombstones = await db.table("problem_tombstones").select("problem_id").gt("deleted_at", window).execute()
+    # Never move past what the snapshot has seen; tombstones newer than that are just sent again
+    version = max(since_ts, catalog.watermark) if catalog.watermark else since_ts
+    return {
+        "version": version.isoformat(),
+        "upserted": rows_as(catalog.changed_since(window), media_type),
+        "deleted": column_values(tombstones, "problem_id"),
+    }
+
+@router.get("/changes")
+async def get_problem_changes(request: Request, since: Optional[str] = None, db=Depends(get_db)):
+    """Problems upserted and deleted since a catalog version (every problem without `since`)"""
+    try:
+        media_type = negotiate(request.headers.get("accept", ""))
+        if since is None:
+            return (await get_catalog(db)).changes_payload(media_type).response(request.headers)
+        return negotiated_response(await catalog_changes(db, since, media_type), media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search", response_model=List[Problem])
+async def search_problems(
+    request: Request,
+    q: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    topic: Optional[str] = None,
+    subtopic: Optional[str] = None,
+    company_tag: List[int] = Query([]),
+    solved: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    fields: Optional[str] = None,
+    current_user: Optional[str] = Depends(get_optional_username),
+    db=Depends(get_db),
+):
+    """Search and filter problems; every given filter must match"""
+    try:
+        selected = _parse_fields(fields)
+        media_type = negotiate(request.headers.get("accept", ""))
+        if solved is not None and current_user is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        catalog = await get_catalog(db)
+        
+        ids = None
+        if company_tag:
+            ids = (await get_problem_tag_map(db)).problem_ids(company_tag)
+        exclude_ids = None
+        if solved is not None:
+            solved_resp = await db.table("user_progress").select("problem_id").eq("user_id", current_user).eq("solved", True).execute()
+            solved_ids = column_values(solved_resp, "problem_id")
+            if solved:
+                ids = solved_ids if ids is None else set(ids) & set(solved_ids)
+            else:
+                exclude_ids = solved_ids
+        
+        positions = catalog.match(
+            text=q, topic=topic, subtopic=subtopic, difficulty=difficulty, ids=ids, exclude_ids=exclude_ids
+        )
+        page = catalog.page(_decode_cursor(cursor) if cursor is not None else None, limit, positions)
+        headers = {"X-Total-Count": str(len(positions))}
+        if len(page) == limit:
+            headers["X-Next-Cursor"] = _encode_cursor(page[-1]["id"])
+        problems = await _with_fields(db, page, selected)
+        return negotiated_response(rows_as(problems, media_type), media_type, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/suggest")
+async def suggest_problems(q: str = "", limit: int = Query(10, ge=1, le=10), db=Depends(get_db)):
+    """Title typeahead: problems whose title, link slug or number starts with q"""
+    try:
+        matches = suggest(await get_catalog(db), q, limit)
+        return json_response([
+            {"id": p["id"], "number": p["number"], "title": p["title"], "difficulty": p["difficulty"], "link": p["link"]}
+            for p in matches
+        ])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/facets")
+async def get_problem_facets(
+    solved: bool = False,
+    current_user: Optional[str] = Depends(get_optional_username),
+    db=Depends(get_db),
+):
+    """Problem counts per difficulty, topic, subtopic and company tag (and for the caller's solved problems)"""
+    try:
+        if solved and current_user is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        catalog = await get_catalog(db)
+        
+        facets = dict(catalog.facets, company_tags=(await get_problem_tag_map(db)).tag_counts())
+        
+        if solved:
+            solved_resp = await db.table("user_progress").select("problem_id").eq("user_id", current_user).eq("solved", True).execute()
+            positions = catalog.match(ids=column_values(solved_resp, "problem_id"))
+            solved_tags = await (
+                db.table("problem_company_tags").select("problem_company_tags.tag_id").count()
+                .join("user_progress", "problem_id", "problem_id")
+                .eq("user_progress.user_id", current_user).eq("user_progress.solved", True)
+                .group_by("problem_company_tags.tag_id")
+                .execute()
+            )
+            facets["solved"] = dict(
+                catalog.count_facets(positions),
+                company_tags={row["tag_id"]: row["count"] for row in solved_tags.data},
+            )
+        return json_response(facets)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{problem_id}", response_model=Problem)
-async def get_problem(problem_id: int):
-    """Get a specific problem by ID"""
+async def get_problem(problem_id: int, fields: Optional[str] = None, db=Depends(get_db)):
+    """Get a specific problem by ID (solution_text only if `fields` asks for it)"""
     try:
-        supabase = get_supabase()
-        response = supabase.table("problems").select("*").eq("id", problem_id).execute()
-        if not response.data:
+        selected = _parse_fields(fields)
+        problem = (await get_catalog(db)).get(problem_id)
+        if problem is None:
             raise HTTPException(status_code=404, detail="Problem not found")
-        result = response.data[0]
-        # Parse topics from JSON string to list
-        if isinstance(result.get('topics'), str):
-            result['topics'] = json.loads(result['topics'])
-        return Problem(**result)
+        return json_response((await _with_fields(db, [problem], selected))[0])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{problem_id}/solution")
+async def get_problem_solution(problem_id: int, request: Request, db=Depends(get_db)):
+    """Get a problem's solution_text"""
+    try:
+        payload = await solution_payload(db, await get_catalog(db), problem_id)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Problem not found")
+        return payload.response(request.headers)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/", response_model=Problem)
-async def create_problem(problem: ProblemCreate):
+async def create_problem(problem: ProblemCreate, db=Depends(get_db)):
     """Create a new problem"""
     try:
-        supabase = get_supabase()
-        # Convert topics list to JSON string for Supabase
         data = problem.dict()
         # Explicitly build insert dict without id
         insert_data = {
             'number': data['number'],
             'title': data['title'],
             'difficulty': data['difficulty'],
-            'topics': json.dumps(data['topics']),
+            'topics': data['topics'],
             'link': data['link'],
         }
         if 'subtopic' in data and data['subtopic']:
@@ -72,46 +272,49 @@ async def create_problem(problem: ProblemCreate):
         if 'solution_text' in data and data['solution_text']:
             insert_data['solution_text'] = data['solution_text']
         
-        response = supabase.table("problems").insert(insert_data).execute()
-        result = response.data[0]
-        # Parse topics from JSON string to list
-        if isinstance(result.get('topics'), str):
-            result['topics'] = json.loads(result['topics'])
-        return Problem(**result)
+        response = await db.table("problems").insert(insert_data).execute()
+        await refresh_catalog(db)
+        return json_response(problem_row(response.data[0], with_solution=True))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{problem_id}", response_model=Problem)
-async def update_problem(problem_id: int, problem: ProblemUpdate):
+async def update_problem(problem_id: int, problem: ProblemUpdate, db=Depends(get_db)):
     """Update an existing problem"""
     import logging
     logger = logging.getLogger(__name__)
     try:
-        supabase = get_supabase()
-        logger.info(f"update_problem: Using database client type: {type(supabase).__name__}")
+        logger.info(f"update_problem: Using database client type: {type(db).__name__}")
         data = problem.dict(exclude_none=True)
         
-        # Convert topics to JSON if present
-        if 'topics' in data and data['topics']:
-            data['topics'] = json.dumps(data['topics'])
-        
-        response = supabase.table("problems").update(data).eq("id", problem_id).execute()
+        previous = (await get_catalog(db)).get(problem_id)
+        response = await db.table("problems").update(data).eq("id", problem_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Problem not found")
-        return Problem(**response.data[0])
+        await refresh_catalog(db)
+        if previous is None or previous["difficulty"] != response.data[0]["difficulty"]:
+            # Solves of this problem now count under another difficulty
+            solvers = await db.table("user_progress").select("user_id").eq("problem_id", problem_id).eq("solved", True).execute()
+            await reconcile(db, [row["user_id"] for row in solvers.data])
+        return json_response(problem_row(response.data[0], with_solution=True))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{problem_id}")
-async def delete_problem(problem_id: int):
+async def delete_problem(problem_id: int, db=Depends(get_db)):
     """Delete a problem"""
     try:
-        supabase = get_supabase()
-        response = supabase.table("problems").delete().eq("id", problem_id).execute()
+        progress = await db.table("user_progress").select("user_id").eq("problem_id", problem_id).execute()
+        response = await db.table("problems").delete().eq("id", problem_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Problem not found")
+        await refresh_catalog(db)
+        # Its tag rows went too (ON DELETE CASCADE)
+        invalidate_problem_tags()
+        # Progress rows went with the problem (ON DELETE CASCADE)
+        await reconcile(db, [row["user_id"] for row in progress.data])
         return {"message": "Problem deleted successfully"}
     except HTTPException:
         raise
@@ -119,24 +322,15 @@ async def delete_problem(problem_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/by-category/{category}", response_model=List[Problem])
-async def get_problems_by_category(category: str):
+async def get_problems_by_category(category: str, request: Request, fields: Optional[str] = None, db=Depends(get_db)):
     """Get problems by category/topic"""
     try:
-        supabase = get_supabase()
-        # Search in JSON array field
-        response = supabase.table("problems").select("*").execute()
-        
-        # Filter in Python (Supabase JSONB filtering can be complex)
-        filtered = []
-        for problem in response.data:
-            # Parse topics if it's a string
-            if isinstance(problem.get('topics'), str):
-                problem['topics'] = json.loads(problem['topics'])
-            topics = problem.get('topics', [])
-            if category in topics:
-                filtered.append(Problem(**problem))
-        
-        return filtered
+        selected = _parse_fields(fields)
+        media_type = negotiate(request.headers.get("accept", ""))
+        problems = (await get_catalog(db)).find(topic=category)
+        return negotiated_response(rows_as(await _with_fields(db, problems, selected), media_type), media_type)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,22 +1,52 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
-from app.database import get_supabase
-from app.models import UserProgress, ProgressStats, CalendarData, MarkSolvedRequest
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, Request
+from app.database import get_db, column_values
+from app.responses import json_response, negotiate, negotiated_response
+from app.models import UserProgress, ProgressStats, CalendarResponse, MarkSolvedRequest, ProgressBatchRequest
 from typing import List, Optional
 from datetime import date, timedelta
 import json
 from app.auth import get_current_username
+from app.catalog import get_catalog
+from app.progress_counters import get_counters, update_progress
 
 router = APIRouter()
 
+# UNIQUE(user_id, problem_id) on user_progress - conflict target for upserts
+PROGRESS_KEY = "user_id,problem_id"
+
+def progress_stats(counters: dict, totals: dict) -> dict:
+    """ProgressStats from a user's counters and the catalog's problem counts per difficulty"""
+    return {
+        "total_problems": sum(totals.values()),
+        "solved_problems": counters['easy_solved'] + counters['medium_solved'] + counters['hard_solved'],
+        "easy_solved": counters['easy_solved'],
+        "easy_total": totals.get('Easy', 0),
+        "medium_solved": counters['medium_solved'],
+        "medium_total": totals.get('Medium', 0),
+        "hard_solved": counters['hard_solved'],
+        "hard_total": totals.get('Hard', 0),
+        "revision_count": counters['revision_count'],
+        "last_solved_at": counters['last_solved_at'],
+    }
+
+def _streaks(active_days, today: date):
+    """(current, longest) runs of consecutive days in ascending active_days; current must end today"""
+    longest = run = 0
+    previous = None
+    for day in active_days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    return (run if previous == today else 0), longest
+
 @router.get("/{user_id}/solved", response_model=List[int])
-async def get_solved_problems(user_id: str, current_user: str = Depends(get_current_username)):
-    """Get list of solved problem IDs for a user"""
+async def get_solved_problems(user_id: str, request: Request, current_user: str = Depends(get_current_username), db=Depends(get_db)):
+    """Get list of solved problem IDs for a user (MessagePack if the Accept header asks for it)"""
     try:
-        supabase = get_supabase()
         # Use auth identity as the user id, ignore client-sent user_id to prevent mismatches
         uid = current_user
-        response = supabase.table("user_progress").select("problem_id").eq("user_id", uid).eq("solved", True).execute()
-        return [row['problem_id'] for row in response.data]
+        response = await db.table("user_progress").select("problem_id").eq("user_id", uid).eq("solved", True).execute()
+        return negotiated_response(column_values(response, "problem_id"), negotiate(request.headers.get("accept", "")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -25,12 +55,12 @@ async def mark_problem_solved(
     user_id: str,
     problem_id: int,
     current_user: str = Depends(get_current_username),
-    request: Optional[MarkSolvedRequest] = Body(None)
+    request: Optional[MarkSolvedRequest] = Body(None),
+    db=Depends(get_db)
 ):
     """Mark a problem as solved for a user"""
     try:
         import logging
-        supabase = get_supabase()
         uid = current_user
         
         # Get solved_at from request body (user's local date) or use server date as fallback
@@ -58,198 +88,179 @@ async def mark_problem_solved(
         
         logging.info(f"Final solved_at date: {solved_at_str}")
         
-        # Check if entry exists
-        existing = supabase.table("user_progress").select("*").eq("user_id", uid).eq("problem_id", problem_id).execute()
-        
-        if existing.data:
-            # Update existing entry - always update solved_at when marking as solved
-            response = supabase.table("user_progress").update({
-                "solved": True,
-                "solved_at": solved_at_str
-            }).eq("user_id", uid).eq("problem_id", problem_id).execute()
-        else:
-            # Insert new entry
-            response = supabase.table("user_progress").insert({
-                "user_id": uid,
-                "problem_id": problem_id,
-                "solved": True,
-                "solved_at": solved_at_str
-            }).execute()
+        # Insert or update in one statement - always update solved_at when marking as solved
+        await update_progress(db, uid, [problem_id], db.table("user_progress").upsert({
+            "user_id": uid,
+            "problem_id": problem_id,
+            "solved": True,
+            "solved_at": solved_at_str
+        }, on_conflict=PROGRESS_KEY))
         
         return {"message": "Problem marked as solved", "solved_at": solved_at_str}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{user_id}/solved/{problem_id}")
-async def mark_problem_unsolved(user_id: str, problem_id: int, current_user: str = Depends(get_current_username)):
+async def mark_problem_unsolved(user_id: str, problem_id: int, current_user: str = Depends(get_current_username), db=Depends(get_db)):
     """Mark a problem as unsolved for a user by setting solved to False"""
     try:
-        supabase = get_supabase()
         uid = current_user
-        # Ensure row exists; if not, create one with solved False (idempotent)
-        existing = supabase.table("user_progress").select("*").eq("user_id", uid).eq("problem_id", problem_id).execute()
-        if existing.data:
-            supabase.table("user_progress").update({
-                "solved": False,
-                "solved_at": None
-            }).eq("user_id", uid).eq("problem_id", problem_id).execute()
-        else:
-            supabase.table("user_progress").insert({
-                "user_id": uid,
-                "problem_id": problem_id,
-                "solved": False,
-                "solved_at": None
-            }).execute()
+        # Ensure row exists with solved False (idempotent)
+        await update_progress(db, uid, [problem_id], db.table("user_progress").upsert({
+            "user_id": uid,
+            "problem_id": problem_id,
+            "solved": False,
+            "solved_at": None
+        }, on_conflict=PROGRESS_KEY))
         return {"message": "Problem marked as unsolved"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Revision endpoints
 @router.get("/{user_id}/revision", response_model=List[int])
-async def get_revision_list(user_id: str, current_user: str = Depends(get_current_username)):
+async def get_revision_list(user_id: str, request: Request, current_user: str = Depends(get_current_username), db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        response = supabase.table("user_progress").select("problem_id").eq("user_id", current_user).eq("in_revision", True).execute()
-        return [row['problem_id'] for row in response.data]
+        response = await db.table("user_progress").select("problem_id").eq("user_id", current_user).eq("in_revision", True).execute()
+        return negotiated_response(column_values(response, "problem_id"), negotiate(request.headers.get("accept", "")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{user_id}/revision/{problem_id}")
-async def add_to_revision(user_id: str, problem_id: int, current_user: str = Depends(get_current_username)):
+async def add_to_revision(user_id: str, problem_id: int, current_user: str = Depends(get_current_username), db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        existing = supabase.table("user_progress").select("*").eq("user_id", current_user).eq("problem_id", problem_id).execute()
-        if existing.data:
-            supabase.table("user_progress").update({"in_revision": True}).eq("user_id", current_user).eq("problem_id", problem_id).execute()
-        else:
-            supabase.table("user_progress").insert({
-                "user_id": current_user,
-                "problem_id": problem_id,
-                "in_revision": True
-            }).execute()
+        await update_progress(db, current_user, [problem_id], db.table("user_progress").upsert({
+            "user_id": current_user,
+            "problem_id": problem_id,
+            "in_revision": True
+        }, on_conflict=PROGRESS_KEY))
         return {"message": "Added to revision"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{user_id}/revision/{problem_id}")
-async def remove_from_revision(user_id: str, problem_id: int, current_user: str = Depends(get_current_username)):
+async def remove_from_revision(user_id: str, problem_id: int, current_user: str = Depends(get_current_username), db=Depends(get_db)):
     try:
-        supabase = get_supabase()
-        supabase.table("user_progress").update({"in_revision": False}).eq("user_id", current_user).eq("problem_id", problem_id).execute()
+        await update_progress(
+            db, current_user, [problem_id],
+            db.table("user_progress").update({"in_revision": False}).eq("user_id", current_user).eq("problem_id", problem_id),
+        )
         return {"message": "Removed from revision"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{user_id}/stats", response_model=ProgressStats)
-async def get_user_stats(user_id: str, current_user: str = Depends(get_current_username)):
-    """Get progress statistics for a user"""
+@router.post("/{user_id}/progress:batch", response_model=ProgressStats)
+async def apply_progress_batch(
+    user_id: str,
+    batch: ProgressBatchRequest,
+    current_user: str = Depends(get_current_username),
+    db=Depends(get_db),
+):
+    """
+    Apply many solve/unsolve/revision changes in one transaction and return the new stats.
+    Operations on the same problem apply in order, so the last one of each kind wins.
+    Solves and unsolves are one multi-row upsert, revision adds another and revision
+    removals one update, however many problems the batch covers.
+    """
     try:
-        supabase = get_supabase()
-        
-        # Get all problems with pagination
-        all_problems = []
-        offset = 0
-        page_size = 1000
-        while True:
-            problems_response = supabase.table("problems").select("*").range(offset, offset + page_size - 1).execute()
-            all_problems.extend(problems_response.data)
-            if len(problems_response.data) < page_size:
-                break
-            offset += page_size
-        
-        # Get solved problems for user
-        solved_ids_set = set()
-        offset = 0
-        while True:
-            solved_response = supabase.table("user_progress").select("problem_id").eq("user_id", current_user).eq("solved", True).range(offset, offset + page_size - 1).execute()
-            for row in solved_response.data:
-                solved_ids_set.add(row['problem_id'])
-            if len(solved_response.data) < page_size:
-                break
-            offset += page_size
-        solved_ids = solved_ids_set
-        
-        # Calculate stats
-        total = len(all_problems)
-        solved = len(solved_ids)
+        uid = current_user
+        today = date.today()
+        # problem_id -> solved_at (None: unsolved), problem_id -> in_revision
+        solved, in_revision = {}, {}
+        for operation in batch.operations:
+            if operation.action == "solve":
+                solved[operation.problem_id] = operation.solved_at or today
+            elif operation.action == "unsolve":
+                solved[operation.problem_id] = None
+            else:
+                in_revision[operation.problem_id] = operation.action == "add_revision"
         
-        easy_solved = 0
-        medium_solved = 0
-        hard_solved = 0
-        easy_total = 0
-        medium_total = 0
-        hard_total = 0
+        problem_ids = list(dict.fromkeys([*solved, *in_revision]))
+        catalog = await get_catalog(db)
+        unknown = [problem_id for problem_id in problem_ids if catalog.get(problem_id) is None]
+        if unknown:
+            # The catalog can lag behind problems created by other instances
+            found = await db.table("problems").select("id").in_("id", unknown).execute()
+            unknown = sorted(set(unknown) - set(column_values(found, "id")))
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown problem ids: {unknown}")
         
-        for problem in all_problems:
-            if problem['difficulty'] == 'Easy':
-                easy_total += 1
-                if problem['id'] in solved_ids:
-                    easy_solved += 1
-            elif problem['difficulty'] == 'Medium':
-                medium_total += 1
-                if problem['id'] in solved_ids:
-                    medium_solved += 1
-            elif problem['difficulty'] == 'Hard':
-                hard_total += 1
-                if problem['id'] in solved_ids:
-                    hard_solved += 1
+        queries = []
+        if solved:
+            queries.append(db.table("user_progress").upsert([
+                {
+                    "user_id": uid,
+                    "problem_id": problem_id,
+                    "solved": solved_at is not None,
+                    "solved_at": solved_at.isoformat() if solved_at is not None else None,
+                }
+                for problem_id, solved_at in solved.items()
+            ], on_conflict=PROGRESS_KEY))
+        added = [problem_id for problem_id, flag in in_revision.items() if flag]
+        if added:
+            queries.append(db.table("user_progress").upsert(
+                [{"user_id": uid, "problem_id": problem_id, "in_revision": True} for problem_id in added],
+                on_conflict=PROGRESS_KEY,
+            ))
+        removed = [problem_id for problem_id, flag in in_revision.items() if not flag]
+        if removed:
+            queries.append(
+                db.table("user_progress").update({"in_revision": False}).eq("user_id", uid).in_("problem_id", removed)
+            )
         
-        return ProgressStats(
-            total_problems=total,
-            solved_problems=solved,
-            easy_solved=easy_solved,
-            easy_total=easy_total,
-            medium_solved=medium_solved,
-            medium_total=medium_total,
-            hard_solved=hard_solved,
-            hard_total=hard_total
-        )
+        if queries:
+            counters = await update_progress(db, uid, problem_ids, *queries)
+        else:
+            counters = await get_counters(db, uid)
+        return json_response(progress_stats(counters, catalog.facets["difficulties"]))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{user_id}/calendar", response_model=List[CalendarData])
-async def get_calendar_data(user_id: str, days: int = 371, current_user: str = Depends(get_current_username)):
-    """Get calendar data for activity tracking"""
+@router.get("/{user_id}/stats", response_model=ProgressStats)
+async def get_user_stats(user_id: str, current_user: str = Depends(get_current_username), db=Depends(get_db)):
+    """
+    Get progress statistics for a user.
+    Solved counts come from the user's counters row, totals from the problem catalog.
+    """
     try:
-        supabase = get_supabase()
-        
-        # Get all solved problems with their solved dates
-        # Use a simpler query - get all solved=True and filter in Python
-        response = supabase.table("user_progress").select("problem_id, solved_at").eq("user_id", current_user).eq("solved", True).execute()
-        
-        # Group by date - normalize date format to YYYY-MM-DD
-        calendar_map = {}
-        for row in response.data:
-            solved_date = row.get('solved_at')
-            if solved_date:
-                # Normalize date to YYYY-MM-DD format
-                # Handle both string and date/datetime objects
-                if isinstance(solved_date, str):
-                    # If it's a string, extract just the date part (YYYY-MM-DD)
-                    date_str = solved_date.split('T')[0] if 'T' in solved_date else solved_date.split(' ')[0]
-                    date_key = date_str[:10] if len(date_str) >= 10 else date_str
-                elif hasattr(solved_date, 'isoformat'):
-                    # It's a date or datetime object
-                    date_key = solved_date.isoformat()[:10]
-                elif hasattr(solved_date, 'date'):
-                    # It's a datetime object, get the date part
-                    date_key = solved_date.date().isoformat()
-                else:
-                    # Fallback: convert to string and take first 10 chars
-                    date_key = str(solved_date)[:10]
-                
-                # Only count if date_key is valid (YYYY-MM-DD format)
-                if len(date_key) == 10 and date_key.count('-') == 2:
-                    calendar_map[date_key] = calendar_map.get(date_key, 0) + 1
-        
-        # Debug: log today's date and calendar data
-        import logging
-        logging.info(f"Calendar data: {calendar_map}")
-        logging.info(f"Today's date: {date.today().isoformat()}")
-        
-        # Return list of calendar data
-        return [CalendarData(date=date_key, problem_count=count) 
-                for date_key, count in calendar_map.items()]
+        counters = await get_counters(db, current_user)
+        return json_response(progress_stats(counters, (await get_catalog(db)).facets["difficulties"]))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def calendar_data(db, user_id: str, days: int, today: date) -> dict:
+    """CalendarResponse for the `days` days ending today"""
+    response = await (
+        db.table("user_progress").select("solved_at").count()
+        .eq("user_id", user_id).eq("solved", True)
+        .gte("solved_at", (today - timedelta(days=days - 1)).isoformat()).lte("solved_at", today.isoformat())
+        .group_by("solved_at").order("solved_at")
+        .execute()
+    )
+    
+    current_streak, longest_streak = _streaks([row['solved_at'] for row in response.data], today)
+    return {
+        "days": [{"date": row['solved_at'].isoformat(), "problem_count": row['count']} for row in response.data],
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+    }
+
+@router.get("/{user_id}/calendar", response_model=CalendarResponse)
+async def get_calendar_data(
+    user_id: str,
+    days: int = Query(371, ge=1, le=3660),
+    today: Optional[date] = None,
+    current_user: str = Depends(get_current_username),
+    db=Depends(get_db),
+):
+    """
+    Solved count per day for the `days` days ending `today` (the caller's local date; default
+    the server's), with the current and longest streaks of active days in that window.
+    Counted by Postgres over the window only, not the user's whole history.
+    """
+    try:
+        return json_response(await calendar_data(db, current_user, days, today or date.today()))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,5 +1,5 @@
 """
-Script to import problems from data.js into Supabase
+Script to import problems from data.js into the database (RDS, or Supabase without RDS_HOST)
 """
 import json
 import ast
@@ -39,13 +39,13 @@ def extract_problems_from_js(js_file_path):
     return problems
 
 def import_problems():
-    """Import problems to Supabase"""
+    """Import problems to the database"""
     print("Importing problems from data.js...")
     
     # Read data.js
     problems_data = extract_problems_from_js('../data.js')
     
-    # Clean and prepare data for Supabase
+    # Clean and prepare the rows
     import_data = []
     for problem in problems_data:
         # Parse topics (could be a string representation or list)
@@ -71,16 +71,16 @@ def import_problems():
             'number': problem['number'],
             'title': problem['title'],
             'difficulty': problem['difficulty'],
-            'topics': topics,  # Supabase will handle JSON
+            'topics': topics,  # Both clients store the list as JSON
             'link': problem['link'],
             'subtopic': problem.get('subtopic', '')
         })
     
-    # Import to Supabase
+    # RDS client, or Supabase when RDS_HOST is unset (see app.database)
     supabase = get_supabase()
     
-    # Batch insert (Supabase allows inserting multiple rows)
-    batch_size = 100
+    # Batch insert (Supabase and RDS both take a list of rows; large RDS batches go through COPY)
+    batch_size = 1000
     for i in range(0, len(import_data), batch_size):
         batch = import_data[i:i + batch_size]
         print(f"Importing batch {i // batch_size + 1} ({len(batch)} problems)...")
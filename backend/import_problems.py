@@ -62,8 +62,8 @@ def import_to_supabase(problems):
     
     supabase = get_supabase()
     
-    # Batch insert
-    batch_size = 50
+    # Batch insert - each batch is a single multi-row insert (COPY on RDS)
+    batch_size = 1000
     total = len(problems)
     
     print(f"Importing {total} problems to Supabase...")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Recompute user_progress_counters from user_progress.
+
+The progress endpoints keep the counters current; run this on a schedule to repair any
+drift, or after editing user_progress or problems outside the API.
+Without a user_id, every user with a counters row is reconciled, BATCH_SIZE users per
+transaction (users without one get theirs computed on first use).
+Usage: python reconcile_progress_counters.py [user_id]
+"""
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import open_session
+from app.progress_counters import COUNTERS_TABLE, reconcile
+
+BATCH_SIZE = 500
+
+async def main(user_id=None):
+    db = open_session()
+    try:
+        if user_id is not None:
+            written = await reconcile(db, [user_id])
+        else:
+            written = 0
+            # User ids come through a server-side cursor, so memory stays flat with the user
+            # count. It reads on its own session: the cursor's transaction stays open
+            # throughout, and each batch must commit on its own.
+            reader = open_session()
+            try:
+                async for rows in reader.table(COUNTERS_TABLE).select("user_id").order("user_id").stream(BATCH_SIZE):
+                    written += await reconcile(db, [row["user_id"] for row in rows])
+            finally:
+                await reader.close()
+    finally:
+        await db.close()
+    print(f"Reconciled progress counters: {written} row(s) written")
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,34 @@
+"""
+A rebuilt snapshot adjusts the previous snapshot's facets for the problems that changed;
+the result must equal counting the new catalog from scratch.
+"""
+from app.catalog import CatalogSnapshot
+
+def row(problem_id, difficulty, topics, subtopic=None, title=None):
+    return {
+        "id": problem_id, "number": problem_id, "title": title or f"Problem {problem_id}",
+        "difficulty": difficulty, "topics": topics, "link": None, "subtopic": subtopic,
+        "has_solution": False, "updated_at": None,
+    }
+
+ROWS = [
+    row(1, "Easy", ["Arrays"], "Two Pointers"),
+    row(2, "Medium", ["Arrays", "Graphs"]),
+    row(3, "Hard", ["Graphs"], "BFS"),
+    row(4, "Easy", ["Strings", "Strings"]),
+]
+
+def test_facets_follow_changes():
+    previous = CatalogSnapshot(1, ROWS)
+    rows = [
+        row(1, "Medium", ["Arrays"], "Two Pointers"),  # difficulty changed
+        row(2, "Medium", ["Arrays", "Graphs"], title="Renamed"),  # no facet change
+        row(3, "Hard", ["Trees"], "DFS"),  # topic and subtopic moved
+        row(5, "Hard", ["Strings"], "Parsing"),  # added; 4 removed
+    ]
+    snapshot = CatalogSnapshot(2, rows, previous=previous)
+    assert snapshot.facets == CatalogSnapshot(2, rows).facets
+    assert "Graphs" in snapshot.facets["topics"] and "BFS" not in snapshot.facets["topics"]["Graphs"]["subtopics"]
+    assert snapshot.facets["difficulties"] == {"Medium": 2, "Hard": 2}
+    # The previous snapshot's counts are untouched
+    assert previous.facets == CatalogSnapshot(1, ROWS).facets
@@ -0,0 +1,155 @@
+"""
+The columnar JSON and MessagePack formats must decode back to exactly the plain JSON
+response - with the reference decoder below, and with api.js's own decoders (run under
+node, when it is installed). Endpoint tests need a database (RDS_HOST) and are skipped
+without one.
+"""
+import base64
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.responses import COLUMNAR_JSON, JSON, MSGPACK, columnar, encode
+
+msgpack = pytest.importorskip("msgpack")
+
+API_JS = Path(__file__).resolve().parents[2] / "api.js"
+NODE = shutil.which("node")
+
+# Loads api.js with the browser globals it touches, decodes each body and prints them as JSON
+NODE_DECODER = r"""
+const fs = require('fs');
+const store = {};
+global.window = { location: { search: '', pathname: '/' } };
+global.localStorage = {
+    getItem: key => (key in store ? store[key] : null),
+    setItem: (key, value) => { store[key] = String(value); },
+    removeItem: key => { delete store[key]; },
+};
+const source = fs.readFileSync(process.argv[1], 'utf8');
+const { decodeMsgpack, fromColumnar } = new Function(`${source}; return { decodeMsgpack, fromColumnar };`)();
+const decoded = JSON.parse(fs.readFileSync(0, 'utf8')).map(({ format, body, path }) => {
+    const bytes = Buffer.from(body, 'base64');
+    const content = format === 'msgpack' ? decodeMsgpack(new Uint8Array(bytes)) : JSON.parse(bytes.toString('utf8'));
+    if (!path.length) return fromColumnar(content);
+    let parent = content;
+    path.slice(0, -1).forEach(key => { parent = parent[key]; });
+    parent[path[path.length - 1]] = fromColumnar(parent[path[path.length - 1]]);
+    return content;
+});
+process.stdout.write(JSON.stringify(decoded));
+"""
+
+ROWS = [
+    {"id": 1, "title": "Two Sum", "topics": ["Arrays", "Hashing"], "subtopic": "Lookup", "has_solution": True},
+    {"id": 2, "title": "Valid Parentheses", "topics": ["Stack"], "subtopic": None, "has_solution": False},
+    {"id": 3, "title": "Untagged", "topics": [], "subtopic": "Lookup", "has_solution": False},
+    {"id": 4, "title": "Hash Map", "topics": ["Hashing", "Arrays"], "subtopic": None, "has_solution": True},
+]
+
+def from_columnar(table):
+    """Reference decoder: rows back from {count, columns, dictionaries}; plain lists pass through"""
+    if table is None or isinstance(table, list):
+        return table
+    columns, dictionaries = table["columns"], table["dictionaries"]
+
+    def lookup(field, value):
+        if field not in dictionaries or value is None:
+            return value
+        if isinstance(value, list):
+            return [dictionaries[field][code] for code in value]
+        return dictionaries[field][value]
+
+    return [
+        {field: lookup(field, values[i]) for field, values in columns.items()}
+        for i in range(table["count"])
+    ]
+
+def decode(body: bytes, media_type: str, path=()):
+    """A response body in media_type back to the plain JSON shape (rows at path)"""
+    content = msgpack.unpackb(body, strict_map_key=False) if media_type == MSGPACK else json.loads(body)
+    if not path:
+        return from_columnar(content)
+    parent = content
+    for key in path[:-1]:
+        parent = parent[key]
+    parent[path[-1]] = from_columnar(parent[path[-1]])
+    return content
+
+def as_json(content):
+    """content as it reads after a JSON round trip (e.g. integer map keys become strings)"""
+    return json.loads(json.dumps(content))
+
+def node_decode(bodies):
+    """Decode [(body, media_type, path)] with api.js"""
+    payload = [
+        {"format": "msgpack" if media_type == MSGPACK else "json",
+         "body": base64.b64encode(body).decode("ascii"), "path": list(path)}
+        for body, media_type, path in bodies
+    ]
+    result = subprocess.run(
+        [NODE, "-e", NODE_DECODER, str(API_JS)], input=json.dumps(payload),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+@pytest.mark.parametrize("media_type", [COLUMNAR_JSON, MSGPACK])
+@pytest.mark.parametrize("rows", [ROWS, ROWS[:1], []])
+def test_columnar_round_trip(rows, media_type):
+    assert decode(encode(columnar(rows), media_type), media_type) == rows
+
+def test_columnar_dictionary_encodes_repeated_values():
+    table = columnar(ROWS)
+    assert table["dictionaries"]["topics"] == ["Arrays", "Hashing", "Stack"]
+    assert table["columns"]["topics"] == [[0, 1], [2], [], [1, 0]]
+    assert table["columns"]["subtopic"] == [0, None, 0, None]
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+def test_api_js_decodes_columnar_rows():
+    bodies = [(encode(columnar(ROWS), media_type), media_type, ()) for media_type in (COLUMNAR_JSON, MSGPACK)]
+    bodies.append((encode({"version": None, "upserted": columnar(ROWS), "deleted": [5]}, MSGPACK), MSGPACK, ("upserted",)))
+    assert node_decode(bodies) == [ROWS, ROWS, {"version": None, "upserted": ROWS, "deleted": [5]}]
+
+# Bulk endpoints against a real database
+
+USER = "format-tests"
+
+ENDPOINTS = [
+    ("/api/problems/", ()),
+    ("/api/problems/changes", ("upserted",)),
+    ("/api/problems/changes?since=2000-01-01T00:00:00", ("upserted",)),
+    ("/api/problems/search?q=a", ()),
+    ("/api/problems/search?difficulty=Easy&limit=5", ()),
+    (f"/api/user/{USER}/bootstrap?today=2026-01-31", ("problems", "upserted")),
+]
+
+@pytest.fixture(scope="module")
+def client():
+    if not os.getenv("RDS_HOST"):
+        pytest.skip("RDS_HOST is not set")
+    from fastapi.testclient import TestClient
+
+    from app.auth import create_access_token
+    from app.main import app
+    with TestClient(app) as test_client:
+        test_client.headers["Authorization"] = f"Bearer {create_access_token(USER)}"
+        yield test_client
+
+def fetch(client, url, media_type):
+    response = client.get(url, headers={"Accept": media_type})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].split(";")[0] == media_type
+    return response.content
+
+@pytest.mark.parametrize("url, path", ENDPOINTS)
+def test_endpoint_formats_match_json(client, url, path):
+    plain = json.loads(fetch(client, url, JSON))
+    bodies = [(fetch(client, url, media_type), media_type, path) for media_type in (COLUMNAR_JSON, MSGPACK)]
+    for body, media_type, _ in bodies:
+        assert as_json(decode(body, media_type, path)) == plain, media_type
+    if NODE is not None:
+        assert node_decode(bodies) == [plain, plain]
@@ -0,0 +1,63 @@
+"""
+Rows are encoded without going through response_model (see app/responses.py), so the
+projected shapes must match the Pydantic models field for field.
+"""
+from datetime import date, datetime
+
+import pytest
+
+from app.catalog import CATALOG_COLUMNS, problem_row
+from app.models import CompanyTag, Problem, ProgressStats
+from app.responses import project
+from app.routers.user_progress import progress_stats
+
+PROBLEM_ROW = {
+    "id": 7, "number": 42, "title": "Trapping Rain Water", "difficulty": "Hard",
+    "topics": ["Arrays", "Two Pointers"], "link": "https://leetcode.com/problems/trapping-rain-water/",
+    "subtopic": "Opposite ends", "solution_text": "two pointers", "updated_at": datetime(2026, 1, 2, 3, 4, 5),
+    "created_at": datetime(2025, 1, 1),
+}
+
+@pytest.mark.parametrize("model, row", [
+    (Problem, dict(PROBLEM_ROW, has_solution=True)),
+    (CompanyTag, {"id": 3, "name": "Google", "created_at": datetime(2025, 1, 1)}),
+])
+def test_project_matches_model(model, row):
+    projected = project(row, model)
+    assert list(projected) == list(model.model_fields)
+    assert projected == model.model_validate(row).model_dump()
+
+def test_project_fills_model_defaults():
+    row = {k: v for k, v in PROBLEM_ROW.items() if k not in ("subtopic", "solution_text")}
+    assert project(row, Problem) == Problem.model_validate(row).model_dump()
+
+def test_problem_row_with_solution_matches_model():
+    assert problem_row(PROBLEM_ROW, with_solution=True) == Problem.model_validate(
+        dict(PROBLEM_ROW, has_solution=True)
+    ).model_dump()
+
+def test_problem_row_for_lists_drops_only_solution_text():
+    row = problem_row(PROBLEM_ROW)
+    expected = Problem.model_validate(dict(PROBLEM_ROW, has_solution=True)).model_dump()
+    del expected["solution_text"]
+    assert row == expected
+
+def test_problem_row_decodes_string_topics():
+    row = dict(PROBLEM_ROW, topics='["Arrays"]', solution_text=None)
+    assert problem_row(row)["topics"] == ["Arrays"]
+    assert problem_row(row)["has_solution"] is False
+
+def test_catalog_columns_cover_list_fields():
+    # Plain columns plus the "... AS has_solution" expression
+    names = {column.rsplit(" AS ", 1)[-1] for column in CATALOG_COLUMNS}
+    assert names - {"updated_at"} == set(Problem.model_fields) - {"solution_text"}
+
+def test_progress_stats_matches_model():
+    counters = {
+        "easy_solved": 3, "medium_solved": 2, "hard_solved": 1,
+        "revision_count": 4, "last_solved_at": date(2026, 10, 1),
+    }
+    stats = progress_stats(counters, {"Easy": 10, "Medium": 20, "Hard": 5})
+    assert list(stats) == list(ProgressStats.model_fields)
+    assert stats == ProgressStats.model_validate(stats).model_dump()
+    assert stats["total_problems"] == 35 and stats["solved_problems"] == 6
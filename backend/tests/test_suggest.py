@@ -0,0 +1,33 @@
+"""
+SuggestIndex keeps the top results of every prefix up to date as problems change; they
+must match ranking a scan of every key.
+"""
+import random
+
+from app.suggest import TOP_K, SuggestIndex, _keys, normalize
+
+WORDS = "two sum array graph tree binary search longest substring valid parentheses merge intervals".split()
+
+def problem(problem_id, rng):
+    return {
+        "id": problem_id, "number": rng.randint(1, 3000),
+        "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 5))),
+        "link": f"https://leetcode.com/problems/{'-'.join(rng.choices(WORDS, k=3))}/",
+    }
+
+def scan(problems, query):
+    prefix = normalize(query)
+    ranked = sorted({(p["number"], p["id"]) for p in problems for key in _keys(p) if key.startswith(prefix)})
+    return [problem_id for _, problem_id in ranked[:TOP_K]]
+
+def test_suggest_matches_scan_after_changes():
+    rng = random.Random(7)
+    problems = [problem(i, rng) for i in range(400)]
+    index = SuggestIndex()
+    index.sync(problems)
+    for i in rng.sample(range(400), 80):
+        problems[i] = problem(i, rng)
+    problems = problems[:350]
+    index.sync(problems)
+    for query in ["t", "tw", "two s", "binary search tr", "valid-paren", "1", "12", "zzz", "merge intervals two sum"]:
+        assert index.suggest(query) == scan(problems, query), query
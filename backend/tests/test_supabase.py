@@ -0,0 +1,269 @@
+"""
+The Supabase client computes joins, grouping and aggregates in process over what PostgREST
+returns. These tests run it, and the API on top of it, against an in-memory stand-in for
+supabase-py's request builder that stores rows the way PostgREST sends them (dates and
+timestamps as ISO strings).
+"""
+import pytest
+
+from app import catalog, database, database_supabase, problem_tags
+from app.database_supabase import SupabaseClient
+
+# Column defaults PostgreSQL fills in (and PostgREST returns) on insert
+DEFAULTS = {"user_progress": {"solved": False, "solved_at": None, "in_revision": False}}
+
+class FakeRequest:
+    """The subset of postgrest's request builder SupabaseClient uses"""
+
+    def __init__(self, tables, name):
+        self.tables, self.name = tables, name
+        self.filters, self.negate = [], False
+        self.order_by, self.bounds = None, None
+
+    @property
+    def rows(self):
+        return self.tables.setdefault(self.name, [])
+
+    def select(self, columns):
+        self.operation, self.columns = 'select', columns.split(',')
+        return self
+
+    def insert(self, json):
+        self.operation, self.payload = 'insert', json
+        return self
+
+    def upsert(self, json, on_conflict='', ignore_duplicates=False):
+        self.operation, self.payload = 'upsert', json
+        self.key, self.ignore = on_conflict.split(','), ignore_duplicates
+        return self
+
+    def update(self, json):
+        self.operation, self.payload = 'update', json
+        return self
+
+    def delete(self):
+        self.operation = 'delete'
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def _filter(self, op, column, value):
+        self.filters.append((op, column, value, self.negate))
+        self.negate = False
+        return self
+
+    def eq(self, column, value):
+        return self._filter('eq', column, value)
+
+    def neq(self, column, value):
+        return self._filter('neq', column, value)
+
+    def gt(self, column, value):
+        return self._filter('gt', column, value)
+
+    def gte(self, column, value):
+        return self._filter('gte', column, value)
+
+    def lt(self, column, value):
+        return self._filter('lt', column, value)
+
+    def lte(self, column, value):
+        return self._filter('lte', column, value)
+
+    def in_(self, column, values):
+        return self._filter('in_', column, values)
+
+    def is_(self, column, value):
+        return self._filter('is_', column, value)
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def _matches(self, row):
+        tests = {
+            'eq': lambda a, b: a == b, 'neq': lambda a, b: a != b, 'gt': lambda a, b: a is not None and a > b,
+            'gte': lambda a, b: a is not None and a >= b, 'lt': lambda a, b: a is not None and a < b,
+            'lte': lambda a, b: a is not None and a <= b, 'in_': lambda a, b: a in b,
+            'is_': lambda a, b: a is None if b in (None, 'null') else a is b,
+        }
+        return all(tests[op](row.get(column), value) != negate for op, column, value, negate in self.filters)
+
+    def execute(self):
+        class Result:
+            pass
+        result = Result()
+        if self.operation == 'select':
+            rows = [row for row in self.rows if self._matches(row)]
+            if self.order_by:
+                column, desc = self.order_by
+                rows.sort(key=lambda row: row[column], reverse=desc)
+            if self.bounds:
+                rows = rows[self.bounds[0]:self.bounds[1] + 1]
+            result.data = [row if self.columns == ['*'] else {c: row.get(c) for c in self.columns} for row in rows]
+        elif self.operation == 'insert':
+            result.data = [self._insert(row) for row in self.payload]
+        elif self.operation == 'upsert':
+            result.data = []
+            for row in self.payload:
+                existing = next((r for r in self.rows if all(r.get(k) == row.get(k) for k in self.key)), None)
+                if existing is None:
+                    result.data.append(self._insert(row))
+                elif not self.ignore:
+                    existing.update(row)
+                    result.data.append(dict(existing))
+        else:
+            matched = [row for row in self.rows if self._matches(row)]
+            for row in matched:
+                if self.operation == 'update':
+                    row.update(self.payload)
+                else:
+                    self.rows.remove(row)
+            result.data = [dict(row) for row in matched]
+        return result
+
+    def _insert(self, row):
+        row = dict(DEFAULTS.get(self.name, {}), **row)
+        if 'id' not in row and self.name != 'user_progress_counters':
+            row['id'] = max((r['id'] for r in self.rows), default=0) + 1
+        self.rows.append(row)
+        return dict(row)
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return FakeRequest(self.tables, name)
+
+def make_tables():
+    problems = [
+        {"id": i, "number": i, "title": f"Problem {i}", "difficulty": ("Easy", "Medium", "Hard")[i % 3],
+         "topics": ["Arrays"] if i % 2 else ["Graphs", "Arrays"], "link": f"https://example.com/{i}",
+         "subtopic": None, "solution_text": "text" if i == 1 else None,
+         "updated_at": f"2026-01-{i:02d}T10:00:00.123456"}
+        for i in range(1, 8)
+    ]
+    return {
+        "problems": problems,
+        "user_progress": [
+            {"id": 1, "user_id": "ana", "problem_id": 1, "solved": True, "solved_at": "2026-01-03", "in_revision": False},
+            {"id": 2, "user_id": "ana", "problem_id": 2, "solved": True, "solved_at": "2026-01-05", "in_revision": True},
+            {"id": 3, "user_id": "ana", "problem_id": 4, "solved": True, "solved_at": "2026-01-05", "in_revision": False},
+            {"id": 4, "user_id": "bo", "problem_id": 3, "solved": False, "solved_at": None, "in_revision": True},
+        ],
+        "user_progress_counters": [],
+        "company_tags": [{"id": 1, "name": "Acme"}, {"id": 2, "name": "Globex"}],
+        "problem_company_tags": [
+            {"id": 1, "problem_id": 1, "tag_id": 2}, {"id": 2, "problem_id": 1, "tag_id": 1},
+            {"id": 3, "problem_id": 2, "tag_id": 2},
+        ],
+        "problem_tombstones": [],
+    }
+
+@pytest.fixture
+def client():
+    return SupabaseClient(FakeSupabase(make_tables()))
+
+def test_plain_select_converts_dates(client):
+    rows = client.table("user_progress").select("problem_id", "solved_at").eq("user_id", "ana").order("problem_id").execute().data
+    assert [row["solved_at"].isoformat() for row in rows] == ["2026-01-03", "2026-01-05", "2026-01-05"]
+
+def test_reads_every_page(client, monkeypatch):
+    monkeypatch.setattr(database_supabase, "PAGE_SIZE", 2)
+    assert len(client.table("problems").select("id").execute().data) == 7
+    assert [row["id"] for row in client.table("problems").select("id").after("id", 2).limit(3).execute().data] == [3, 4, 5]
+
+def test_aggregates_without_group_return_one_row(client):
+    row = client.table("problem_company_tags").select().max("id").count().execute().data
+    assert row == [{"max": 3, "count": 3}]
+    empty = client.table("problem_company_tags").select().max("id").count().gt("id", 10).execute().data
+    assert empty == [{"max": None, "count": 0}]
+
+def test_join_group_count(client):
+    rows = (
+        client.table("user_progress").select("user_progress.user_id", "problems.difficulty").count()
+        .join("problems", "problem_id").eq("user_progress.solved", True)
+        .in_("user_progress.user_id", ["ana", "bo"]).group_by("user_progress.user_id", "problems.difficulty").execute().data
+    )
+    assert sorted((row["user_id"], row["difficulty"], row["count"]) for row in rows) == [
+        ("ana", "Hard", 1), ("ana", "Medium", 2),
+    ]
+
+def test_join_filters_on_joined_table(client):
+    rows = (
+        client.table("problem_company_tags").select("problem_company_tags.tag_id").count()
+        .join("user_progress", "problem_id", "problem_id")
+        .eq("user_progress.user_id", "ana").eq("user_progress.solved", True)
+        .group_by("problem_company_tags.tag_id").execute().data
+    )
+    assert sorted((row["tag_id"], row["count"]) for row in rows) == [(1, 1), (2, 2)]
+
+def test_array_agg_and_ordered_groups(client):
+    tags = client.table("problem_company_tags").select("problem_id").array_agg("tag_id", "tag_ids").group_by("problem_id").execute().data
+    assert sorted((row["problem_id"], row["tag_ids"]) for row in tags) == [(1, [1, 2]), (2, [2])]
+    days = (
+        client.table("user_progress").select("solved_at").count().eq("user_id", "ana").eq("solved", True)
+        .group_by("solved_at").order("solved_at", desc=True).execute().data
+    )
+    assert [(row["solved_at"].isoformat(), row["count"]) for row in days] == [("2026-01-05", 2), ("2026-01-03", 1)]
+
+def test_select_expressions_are_refused(client):
+    with pytest.raises(ValueError):
+        client.table("problems").select("count(*) AS n").execute()
+
+def test_writes_send_json(client):
+    from datetime import date
+    written = client.table("user_progress").upsert(
+        {"user_id": "bo", "problem_id": 3, "solved": True, "solved_at": date(2026, 2, 1)}, on_conflict="user_id,problem_id"
+    ).execute().data
+    assert written[0]["solved_at"] == date(2026, 2, 1)
+    again = client.table("user_progress").upsert(
+        {"user_id": "bo", "problem_id": 3, "solved": False}, on_conflict="user_id,problem_id", ignore_duplicates=True
+    ).execute().data
+    assert again == []
+
+# The API over the Supabase client
+
+@pytest.fixture
+def api(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.auth import create_access_token
+    from app.main import app
+    monkeypatch.delenv("RDS_HOST", raising=False)
+    monkeypatch.setattr(database, "_supabase_client", FakeSupabase(make_tables()))
+    monkeypatch.setattr(catalog, "_snapshot", None)
+    problem_tags.invalidate()
+    with TestClient(app) as test_client:
+        test_client.headers["Authorization"] = f"Bearer {create_access_token('ana')}"
+        yield test_client
+    problem_tags.invalidate()
+
+def test_api_reads(api):
+    problems = api.get("/api/problems/").json()
+    assert [p["id"] for p in problems] == list(range(1, 8))
+    assert [p["has_solution"] for p in problems[:2]] == [True, False]
+    stats = api.get("/api/user/ana/stats").json()
+    assert (stats["easy_solved"], stats["medium_solved"], stats["hard_solved"]) == (0, 2, 1)
+    assert stats["last_solved_at"] == "2026-01-05"
+    boot = api.get("/api/user/ana/bootstrap?today=2026-01-31").json()
+    assert boot["solved"] == [1, 2, 4] and boot["revision"] == [2]
+    assert boot["problem_tags"] == {"1": [1, 2], "2": [2]}
+
+def test_api_progress_writes_keep_counters(api):
+    assert api.post("/api/user/ana/solved/3", json={"solved_at": "2026-01-20"}).status_code == 200
+    assert api.delete("/api/user/ana/solved/1").status_code == 200
+    stats = api.get("/api/user/ana/stats").json()
+    assert (stats["easy_solved"], stats["medium_solved"], stats["hard_solved"]) == (1, 1, 1)
+    assert stats["last_solved_at"] == "2026-01-20"
+    assert api.put("/api/problems/3", json={"difficulty": "Hard"}).status_code == 200
+    stats = api.get("/api/user/ana/stats").json()
+    assert (stats["easy_solved"], stats["hard_solved"]) == (0, 2)
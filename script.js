@@ -150,11 +150,11 @@ function countByDifficulty(problems) {
     };
 }
 
-// Update sidebar statistics
-async function updateSidebarStats() {
+// Update sidebar statistics (stats already loaded by the caller skip the requests)
+async function updateSidebarStats(preloadedStats = null) {
     if (USE_API) {
         try {
-            const stats = await api.getStats();
+            const stats = preloadedStats || await api.getStats();
             
             // Update total progress
             const percentage = stats.total_problems > 0 ? Math.round((stats.solved_problems / stats.total_problems) * 100) : 0;
@@ -175,9 +175,11 @@ async function updateSidebarStats() {
             document.getElementById('hardFill').style.width = hardPercentage + '%';
             
             // Update solvedProblems array
-            const solved = await api.getSolvedProblems();
-            solvedProblems = solved;
-            localStorage.setItem('solvedProblems', JSON.stringify(solvedProblems));
+            if (!preloadedStats) {
+                const solved = await api.getSolvedProblems();
+                solvedProblems = solved;
+                localStorage.setItem('solvedProblems', JSON.stringify(solvedProblems));
+            }
         } catch (error) {
             console.error('Failed to fetch stats from API, using local storage:', error);
             updateSidebarStatsLocal();
@@ -809,7 +811,7 @@ function createProblemRow(problem) {
         </td>
         <td>
             <a href="solution.html?id=${problem.id}" class="solution-link" target="_blank">
-                ${problem.solution_text ? '📝 Edit Solution' : '📝 Coming Soon'}
+                ${problem.has_solution ? '📝 Edit Solution' : '📝 Coming Soon'}
             </a>
         </td>
         <td>
@@ -895,8 +897,8 @@ async function toggleRevision(problemId) {
     }
 }
 
-// Update activity grid with bar heights
-async function updateActivityGrid() {
+// Update activity grid with bar heights (calendarData: an API calendar covering the last 7 days, if already loaded)
+async function updateActivityGrid(calendarData = null) {
     const grid = document.getElementById('activityGrid');
     if (!grid) return;
     
@@ -917,8 +919,8 @@ async function updateActivityGrid() {
     
     if (USE_API) {
         try {
-            const apiCalendarData = await api.getCalendarData();
-            for (const item of apiCalendarData) {
+            const apiCalendarData = calendarData || await api.getCalendarData(7);
+            for (const item of apiCalendarData.days) {
                 activityCounts[item.date] = item.problem_count;
             }
         } catch (error) {
@@ -1035,8 +1037,8 @@ function calculateStreaks(calendarDataMap = null) {
     return { currentStreak, maxStreak };
 }
 
-// Render calendar heatmap
-async function renderCalendar() {
+// Render calendar heatmap (calendarData: the API calendar, if already loaded)
+async function renderCalendar(calendarData = null) {
     const container = document.getElementById('calendarHeatmap');
     container.innerHTML = '';
     
@@ -1047,18 +1049,16 @@ async function renderCalendar() {
     // Load calendar data from API or localStorage
     let calendarDataMap = {};
     let usedApiData = false;
+    let apiStreaks = null;
     
     if (USE_API) {
         try {
-            const apiCalendarData = await api.getCalendarData();
-            console.log('Calendar data from API:', apiCalendarData);
-            const todayKey = formatDate(new Date());
-            console.log("Today's date key:", todayKey);
-            for (const item of apiCalendarData) {
+            const apiCalendarData = calendarData || await api.getCalendarData(daysToShow);
+            for (const item of apiCalendarData.days) {
                 calendarDataMap[item.date] = item.problem_count;
             }
-            console.log('Calendar data map:', calendarDataMap);
-            console.log('Today in map:', calendarDataMap[todayKey]);
+            // Streaks come computed with the calendar
+            apiStreaks = { currentStreak: apiCalendarData.current_streak, maxStreak: apiCalendarData.longest_streak };
             usedApiData = true;
         } catch (error) {
             console.error('Failed to fetch calendar data from API, using local storage:', error);
@@ -1136,8 +1136,8 @@ async function renderCalendar() {
     
     container.appendChild(heatmapWrapper);
     
-    // Update streaks - pass calendarDataMap to use API data
-    const { currentStreak, maxStreak } = calculateStreaks(usedApiData ? calendarDataMap : null);
+    // Update streaks - from the API, or computed from localStorage
+    const { currentStreak, maxStreak } = apiStreaks || calculateStreaks();
     document.getElementById('currentStreak').textContent = currentStreak;
     document.getElementById('maxStreak').textContent = maxStreak;
 }
@@ -1202,43 +1202,34 @@ document.querySelectorAll('.tab').forEach(tab => {
 async function initApp() {
     cleanupActivityTracking(); // Clean up any orphaned activity tracking
     
-    // Load data from API if enabled
+    // Load everything from the API in one request if enabled
+    let boot = null;
     if (USE_API) {
         try {
-            // Load problems from API
-            const allProblems = await api.getAllProblems();
-            leetcodeProblems.length = 0;
-            leetcodeProblems.push(...allProblems);
-            
-            // Load solved problems from API
-            const solved = await api.getSolvedProblems();
-            solvedProblems = solved;
-            localStorage.setItem('solvedProblems', JSON.stringify(solvedProblems));
-            // Load revision list from API only
-            const revision = await api.getRevisionList();
-            revisionProblems = revision;
-            
-            // Load progress stats
-            await updateSidebarStats();
+            boot = await api.getBootstrap();
         } catch (error) {
             console.error('API not available, using local storage:', error);
-            updateSidebarStatsLocal();
         }
+    }
+    
+    if (boot) {
+        leetcodeProblems.length = 0;
+        leetcodeProblems.push(...boot.problems);
+        solvedProblems = boot.solved;
+        localStorage.setItem('solvedProblems', JSON.stringify(solvedProblems));
+        revisionProblems = boot.revision;
+        await updateSidebarStats(boot.stats);
+        
+        // Company tags and the problem -> tags mapping (avoids per-row requests)
+        companyTagsCache = {};
+        boot.company_tags.forEach(t => { companyTagsCache[t.id] = t.name; });
+        problemToTagIds = boot.problem_tags;
     } else {
         updateSidebarStatsLocal();
     }
     
-    await renderCalendar();
-    await updateActivityGrid();
-    // Preload company tags mapping once (avoid per-row requests)
-    if (USE_API) {
-        try {
-            await ensureCompanyTagsCache();
-            problemToTagIds = await api.getAllProblemCompanyTags();
-        } catch (e) {
-            problemToTagIds = {};
-        }
-    }
+    await renderCalendar(boot && boot.calendar);
+    await updateActivityGrid(boot && boot.calendar);
     await renderCompanyTagFilter();
     renderProblemsByTopic();
     initCategories();
@@ -1429,7 +1420,7 @@ function showAddProblemModal(subtopic, topics) {
             const newProblem = await api.createProblem(problemData);
             modal.style.display = 'none';
             // Reload problems from API and re-render
-            const allProblems = await api.getAllProblems();
+            const allProblems = await api.getAllProblemsCached();
             leetcodeProblems.length = 0;
             leetcodeProblems.push(...allProblems);
             renderProblemsByTopic();
@@ -1447,7 +1438,7 @@ async function handleRemoveProblem(problemId) {
     try {
         await api.deleteProblem(problemId);
         // Refresh problems and UI
-        const allProblems = await api.getAllProblems();
+        const allProblems = await api.getAllProblemsCached();
         leetcodeProblems.length = 0;
         leetcodeProblems.push(...allProblems);
         renderProblemsByTopic();